@@ -1,22 +1,27 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, distinct, func
-from typing import List, Optional
+from typing import Dict, List, Optional
+from datetime import datetime
 
 from app.data import data_manager
-from app.database import get_db
+from app.data.pagination import InvalidCursorError
+from app.services.orchestrator import orchestrator
+from app.database import get_pool_stats, get_read_db
 from app.api import schemas
-from app import models
+from app.api.export import EXPORT_FORMATS
+from app.api.serialization import encode_instances, render_instances_response
+from app.core import metrics
 
 router = APIRouter()
 
 @router.get("/filters/options", response_model=schemas.FilterOptions)
-async def get_filters(db: AsyncSession = Depends(get_db)):
+async def get_filters(db: AsyncSession = Depends(get_read_db)):
     """Provides unique values for all filter dropdowns."""
     return await data_manager.get_filter_options(db)
 
-@router.get("/instances", response_model=schemas.InstancesResponse)
-async def read_instances(
+@router.get("/filters/facets", response_model=schemas.FacetCounts)
+async def get_filter_facets(
     providers: Optional[List[str]] = Query(None),
     regions: Optional[List[str]] = Query(None),
     min_vcpus: Optional[int] = Query(None),
@@ -26,18 +31,15 @@ async def read_instances(
     storage_types: Optional[List[str]] = Query(None),
     min_storage: Optional[int] = Query(None),
     instance_name: Optional[str] = Query(None),
-
-    sort_by: str = Query("hourly_cost", enum=["hourly_cost", "vcpus", "memory_gb"]),
-    sort_order: str = Query("asc", enum=["asc", "desc"]),
-    offset: int = Query(0, ge=0),
-    limit: int = Query(25, ge=1, le=100),
-    db: AsyncSession = Depends(get_db)
+    skyline_only: bool = Query(False),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Get instances from the database with powerful filtering, sorting, and pagination.
+    Counts per provider, region, instance family and storage type under the given filters.
+    Each facet ignores its own filter, so counts show what selecting another value would match.
     """
-    result = await data_manager.get_instances(
-        db=db,
+    return await data_manager.get_facets(
+        db,
         providers=providers,
         regions=regions,
         instance_families=instance_families,
@@ -47,54 +49,218 @@ async def read_instances(
         max_monthly_cost=max_monthly_cost,
         min_storage=min_storage,
         instance_name=instance_name,
+        skyline_only=skyline_only
+    )
+
+@router.get("/instances", response_model=schemas.InstancesResponse)
+async def read_instances(
+    providers: Optional[List[str]] = Query(None),
+    regions: Optional[List[str]] = Query(None),
+    min_vcpus: Optional[int] = Query(None),
+    min_memory: Optional[float] = Query(None),
+    max_monthly_cost: Optional[float] = Query(None),
+    instance_families: Optional[List[str]] = Query(None),
+    storage_types: Optional[List[str]] = Query(None),
+    min_storage: Optional[int] = Query(None),
+    instance_name: Optional[str] = Query(None),
+    skyline_only: bool = Query(False, description="Only instances on the skyline of their provider and region (see /instances/skyline)."),
+
+    sort_by: str = Query("hourly_cost", enum=["hourly_cost", "vcpus", "memory_gb"]),
+    sort_order: str = Query("asc", enum=["asc", "desc"]),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(25, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor/prev_cursor from a previous page; overrides offset."),
+    total_mode: str = Query("exact", enum=["exact", "estimated", "none"]),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get instances from the database with powerful filtering, sorting, and pagination.
+    The body is encoded directly from plain rows; response_model only documents it.
+    """
+    try:
+        result = await data_manager.get_instances(
+            db=db,
+            providers=providers,
+            regions=regions,
+            instance_families=instance_families,
+            storage_types=storage_types,
+            min_vcpus=min_vcpus,
+            min_memory=min_memory,
+            max_monthly_cost=max_monthly_cost,
+            min_storage=min_storage,
+            instance_name=instance_name,
+            skyline_only=skyline_only,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            skip=offset,
+            limit=limit,
+            cursor=cursor,
+            total_mode=total_mode
+        )
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return Response(render_instances_response(result), media_type="application/json")
+
+@router.get("/instances/export")
+async def export_instances(
+    export_format: str = Query("ndjson", alias="format", enum=list(EXPORT_FORMATS)),
+    providers: Optional[List[str]] = Query(None),
+    regions: Optional[List[str]] = Query(None),
+    min_vcpus: Optional[int] = Query(None),
+    min_memory: Optional[float] = Query(None),
+    max_monthly_cost: Optional[float] = Query(None),
+    instance_families: Optional[List[str]] = Query(None),
+    storage_types: Optional[List[str]] = Query(None),
+    min_storage: Optional[int] = Query(None),
+    instance_name: Optional[str] = Query(None),
+    skyline_only: bool = Query(False),
+    sort_by: str = Query("hourly_cost", enum=["hourly_cost", "vcpus", "memory_gb"]),
+    sort_order: str = Query("asc", enum=["asc", "desc"]),
+):
+    """
+    Streams every instance matching the /instances filters, without paging or a count,
+    as NDJSON, CSV or Parquet (Parquet needs pyarrow installed).
+    """
+    encoding = EXPORT_FORMATS[export_format]
+    if not encoding.available:
+        raise HTTPException(status_code=501, detail=f"{export_format} export is not available on this server.")
+
+    chunks = data_manager.stream_instances(
+        dict(
+            providers=providers,
+            regions=regions,
+            instance_families=instance_families,
+            storage_types=storage_types,
+            min_vcpus=min_vcpus,
+            min_memory=min_memory,
+            min_storage=min_storage,
+            max_monthly_cost=max_monthly_cost,
+            instance_name=instance_name,
+            skyline_only=skyline_only,
+        ),
         sort_by=sort_by,
         sort_order=sort_order,
-        skip=offset,
-        limit=limit
     )
-    return result
+    return StreamingResponse(
+        encoding.encode(chunks),
+        media_type=encoding.media_type,
+        headers={"Content-Disposition": f'attachment; filename="instances.{encoding.extension}"'},
+    )
+
+@router.get("/instances/autocomplete", response_model=List[schemas.AutocompleteSuggestion])
+async def autocomplete_instances(
+    q: str = Query(..., min_length=1, description="Case-insensitive substring of the instance name."),
+    limit: int = Query(10, ge=1, le=50),
+    providers: Optional[List[str]] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Instance names containing `q`, prefix matches first, for search-as-you-type."""
+    return await data_manager.autocomplete_instance_names(db, q, limit, providers)
+
+@router.get("/instances/skyline", response_model=List[schemas.SkylineGroup])
+async def read_skyline(
+    providers: Optional[List[str]] = Query(None),
+    regions: Optional[List[str]] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Per provider and region, the instances that no other instance there beats: none is
+    at most as expensive with at least as many vCPUs, as much memory and as much storage.
+    Cheapest first. The body is encoded directly from plain rows, as for /instances.
+    """
+    groups = await data_manager.get_skyline(db, providers, regions)
+    content = [
+        {"provider": group["provider"], "region": group["region"], "instances": encode_instances(group["instances"])}
+        for group in groups
+    ]
+    return JSONResponse(content)
+
+@router.get("/instances/history", response_model=schemas.PriceHistory)
+async def read_price_history(
+    provider: str = Query(...),
+    instance_name: str = Query(...),
+    region: str = Query(...),
+    since: Optional[datetime] = Query(None),
+    max_points: Optional[int] = Query(None, ge=1, le=10000, description="Downsample to at most this many points."),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Price series of one instance type in one region, oldest first."""
+    return await data_manager.get_price_history(
+        db,
+        provider=provider,
+        instance_name=instance_name,
+        region=region,
+        since=since,
+        max_points=max_points
+    )
+
+@router.get("/analytics/price-efficiency", response_model=List[schemas.PriceEfficiency])
+async def get_price_efficiency(
+    group_by: str = Query("region", enum=["region", "instance_family", "provider"]),
+    currency: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Min, median and p90 hourly price per vCPU and per GB of memory, per region, family or provider and currency."""
+    return await data_manager.get_price_efficiency(db, group_by, currency)
+
+@router.get("/analytics/cheapest", response_model=List[schemas.CheapestInstance])
+async def get_cheapest_instances(
+    providers: Optional[List[str]] = Query(None),
+    regions: Optional[List[str]] = Query(None),
+    instance_families: Optional[List[str]] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """The cheapest instance by hourly price in every (region, instance family)."""
+    return await data_manager.get_cheapest_instances(db, providers, regions, instance_families)
+
+@router.post("/fleet/recommendations", response_model=List[schemas.FleetRecommendation])
+async def recommend_fleet(request: schemas.FleetRequest, db: AsyncSession = Depends(get_read_db)):
+    """
+    Cheapest mixes of instance types that together provide the requested vCPUs, memory
+    and (local) storage with at most max_nodes instances, one mix per provider and
+    region, cheapest first.
+    """
+    return await data_manager.get_fleet_recommendations(db, **request.model_dump())
+
+@router.get("/fx-rates", response_model=List[schemas.FxRate])
+async def get_fx_rates(db: AsyncSession = Depends(get_read_db)):
+    """Value of one unit of each currency in the reference currency, as used for the normalized costs."""
+    return await data_manager.get_fx_rates(db)
 
 @router.get("/providers", response_model=List[str])
-async def get_providers(db: AsyncSession = Depends(get_db)):
+async def get_providers(db: AsyncSession = Depends(get_read_db)):
     """Lists all supported providers that have data in the database."""
-    query = select(distinct(models.VMInstance.provider)).order_by(models.VMInstance.provider)
-    result = await db.execute(query)
-    return result.scalars().all()
+    return await data_manager.get_providers(db)
 
 @router.get("/regions", response_model=List[str])
-async def get_regions(provider: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+async def get_regions(provider: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
     """Lists all available regions, optionally filtered by provider."""
-    query = select(distinct(models.VMInstance.region))
-    if provider:
-        query = query.where(models.VMInstance.provider == provider)
-    query = query.order_by(models.VMInstance.region)
-    
-    result = await db.execute(query)
-    regions = result.scalars().all()
-    return regions
+    return await data_manager.get_regions(db, provider)
 
 @router.get("/metrics", response_model=schemas.Metrics)
-async def get_metrics(db: AsyncSession = Depends(get_db)):
+async def get_metrics(db: AsyncSession = Depends(get_read_db)):
     """Returns basic metrics about the dataset from the database."""
-    
-    count_query = select(func.count()).select_from(models.VMInstance)
-    total_records = await db.scalar(count_query)
-
-    last_updated_query = (
-        select(
-            models.VMInstance.provider,
-            func.max(models.VMInstance.last_updated).label("last_update")
-        )
-        .group_by(models.VMInstance.provider)
-    )
-    
-    last_updated_results = await db.execute(last_updated_query)
-    last_updated_times = {row.provider: row.last_update for row in last_updated_results}
-
-    return {
-        "total_records": total_records,
-        "last_updated_times": last_updated_times
-    }
+    return await data_manager.get_dataset_metrics(db)
+
+@router.get("/metrics/cache", response_model=schemas.ResultCacheStats)
+async def get_cache_metrics():
+    """Size and hit, miss, eviction and invalidation counts of the /instances result cache."""
+    return data_manager.get_result_cache_stats()
+
+@router.get("/metrics/pool", response_model=Dict[str, schemas.PoolStats])
+async def get_pool_metrics():
+    """Connection pool usage of the primary and each read replica engine."""
+    return get_pool_stats()
+
+@router.get("/metrics/prometheus")
+async def get_prometheus_metrics():
+    """Request latency, SQL time and row counts, pool checkouts and refresh stages in Prometheus text format."""
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+@router.get("/refresh/status", response_model=List[schemas.RefreshStatus])
+async def get_refresh_status():
+    """State, per-stage durations, row counts and last error of each provider's latest refresh."""
+    return orchestrator.get_status()
 
 @router.get("/health")
 async def health_check():
@@ -0,0 +1,150 @@
+import csv
+import io
+import json
+import math
+from typing import IO, Any, AsyncIterator, Callable, Dict, Iterable, List, Mapping, NamedTuple, Sequence
+
+from app.api.serialization import INSTANCE_FIELDS, encode_instances
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional.
+    pa = None
+    pq = None
+
+Chunks = AsyncIterator[List[Mapping[str, Any]]]
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def write_csv(
+    file: IO[str],
+    rows: Iterable[Mapping[str, Any]],
+    fields: Sequence[str] = INSTANCE_FIELDS,
+    header: bool = True,
+) -> None:
+    """
+    Writes rows as CSV with the given columns. NULL and NaN become empty fields, and
+    timestamps keep their str() form, as in data/vm_pricing.csv.
+    """
+    writer = csv.writer(file, lineterminator="\n")
+    if header:
+        writer.writerow(fields)
+    writer.writerows([_csv_value(row[name]) for name in fields] for row in rows)
+
+
+async def encode_csv(chunks: Chunks) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    header = True
+    async for chunk in chunks:
+        write_csv(buffer, chunk, header=header)
+        header = False
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if header:
+        # Nothing matched; still send the header line.
+        write_csv(buffer, [], header=True)
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def encode_ndjson(chunks: Chunks) -> AsyncIterator[bytes]:
+    """One JSON object per line, each formatted exactly like an item of /instances."""
+    async for chunk in chunks:
+        lines = [
+            json.dumps(row, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+            for row in encode_instances(chunk)
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file for ParquetWriter whose contents are drained as the file grows."""
+
+    def __init__(self):
+        self.closed = False
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Offsets in the footer are absolute, so report the full length written.
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_schema():
+    return pa.schema([
+        ("instance_name", pa.string()),
+        ("provider", pa.string()),
+        ("region", pa.string()),
+        ("vcpus", pa.int64()),
+        ("memory_gb", pa.float64()),
+        ("storage_gb", pa.int64()),
+        ("storage_type", pa.string()),
+        ("hourly_cost", pa.float64()),
+        ("monthly_cost", pa.float64()),
+        ("spot_price", pa.float64()),
+        ("currency", pa.string()),
+        ("hourly_cost_normalized", pa.float64()),
+        ("monthly_cost_normalized", pa.float64()),
+        ("instance_family", pa.string()),
+        ("network_performance", pa.string()),
+        ("last_updated", pa.timestamp("us")),
+    ])
+
+
+async def encode_parquet(chunks: Chunks) -> AsyncIterator[bytes]:
+    """A Parquet file with one row group per chunk, sent as each row group is written."""
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    try:
+        async for chunk in chunks:
+            # from_pandas turns NaN into null, as the JSON encoders do.
+            columns = [
+                pa.array([row[field.name] for row in chunk], type=field.type, from_pandas=True)
+                for field in schema
+            ]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+class ExportFormat(NamedTuple):
+    media_type: str
+    extension: str
+    encode: Callable[[Chunks], AsyncIterator[bytes]]
+    available: bool = True
+
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "ndjson": ExportFormat("application/x-ndjson", "ndjson", encode_ndjson),
+    "csv": ExportFormat("text/csv; charset=utf-8", "csv", encode_csv),
+    "parquet": ExportFormat("application/vnd.apache.parquet", "parquet", encode_parquet, available=pa is not None),
+}
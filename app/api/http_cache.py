@@ -0,0 +1,84 @@
+import hashlib
+from typing import Iterable
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp
+
+from app.core.config import settings
+from app.data import data_manager
+
+# Read endpoints whose responses only change when a provider refresh commits.
+CACHEABLE_PATHS = (
+    "/instances",
+    "/instances/autocomplete",
+    "/instances/skyline",
+    "/instances/history",
+    "/filters/options",
+    "/filters/facets",
+    "/providers",
+    "/regions",
+    "/metrics",
+    "/analytics/price-efficiency",
+    "/analytics/cheapest",
+)
+
+
+def normalized_query(request: Request) -> str:
+    """Path plus query parameters in a canonical order, so equivalent URLs share an ETag."""
+    params = sorted(parse_qsl(request.url.query, keep_blank_values=True))
+    return f"{request.url.path}?{urlencode(params)}"
+
+
+def dataset_etag(version: str, request: Request) -> str:
+    query_digest = hashlib.blake2b(normalized_query(request).encode("utf-8"), digest_size=8).hexdigest()
+    # Weak, since the gzip and identity encodings of a response share the tag.
+    return f'W/"{version}-{query_digest}"'
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison, as RFC 9110 prescribes for If-None-Match."""
+    tags = {_opaque(tag.strip()) for tag in if_none_match.split(",")}
+    return "*" in tags or _opaque(etag) in tags
+
+
+class DatasetCacheMiddleware(BaseHTTPMiddleware):
+    """
+    Conditional GETs for the read endpoints. The ETag combines the dataset version,
+    which every ingest changes, with the normalized query, so a matching
+    If-None-Match is answered with 304 before routing and without touching the
+    database. Successful responses carry the ETag and a Cache-Control max-age for
+    browsers, the CDN and nginx.
+    """
+
+    def __init__(self, app: ASGIApp, prefix: str = "", paths: Iterable[str] = CACHEABLE_PATHS):
+        super().__init__(app)
+        self.paths = {f"{prefix}{path}" for path in paths}
+        self.cache_control = f"public, max-age={settings.HTTP_CACHE_MAX_AGE_SECONDS}"
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        if request.method not in ("GET", "HEAD") or request.url.path not in self.paths:
+            return await call_next(request)
+
+        # None until the first snapshot is loaded; those responses go out untagged.
+        version = data_manager.get_dataset_version()
+        if version is None:
+            return await call_next(request)
+
+        etag = dataset_etag(version, request)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": self.cache_control})
+
+        response = await call_next(request)
+        # An ingest that committed while the response was built makes the tag stale.
+        if response.status_code == 200 and data_manager.get_dataset_version() == version:
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = self.cache_control
+        return response
@@ -1,5 +1,5 @@
 import math
-from pydantic import BaseModel, field_serializer
+from pydantic import BaseModel, Field, field_serializer, model_validator
 from typing import Optional, List
 from datetime import datetime
 
@@ -15,11 +15,13 @@ class VMInstance(BaseModel):
     monthly_cost: Optional[float] = None
     spot_price: Optional[float] = None
     currency: str = "USD"
+    hourly_cost_normalized: Optional[float] = None
+    monthly_cost_normalized: Optional[float] = None
     instance_family: Optional[str] = None
     network_performance: Optional[str] = None
     last_updated: datetime
 
-    @field_serializer('hourly_cost', 'monthly_cost', 'spot_price', 'memory_gb')
+    @field_serializer('hourly_cost', 'monthly_cost', 'spot_price', 'memory_gb', 'hourly_cost_normalized', 'monthly_cost_normalized')
     def serialize_floats(self, value: Optional[float]):
         if value is None or math.isnan(value):
             return None
@@ -30,15 +32,164 @@ class VMInstance(BaseModel):
     }
 
 class InstancesResponse(BaseModel):
-    total: int
+    total: Optional[int] = None
     instances: List[VMInstance]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
     
+class SkylineGroup(BaseModel):
+    provider: str
+    region: str
+    instances: List[VMInstance]
+
 class FilterOptions(BaseModel):
     providers: List[str]
     regions: List[str]
     instance_families: List[str]
     storage_types: List[str]
 
+class FacetValue(BaseModel):
+    value: str
+    count: int
+
+class FacetCounts(BaseModel):
+    total: int
+    providers: List[FacetValue]
+    regions: List[FacetValue]
+    instance_families: List[FacetValue]
+    storage_types: List[FacetValue]
+
+class AutocompleteSuggestion(BaseModel):
+    instance_name: str
+    provider: str
+
+class PriceStats(BaseModel):
+    min: float
+    median: float
+    p90: float
+
+class PriceEfficiency(BaseModel):
+    key: str
+    currency: str
+    instances: int
+    per_vcpu: Optional[PriceStats] = None
+    per_gb: Optional[PriceStats] = None
+
+class CheapestInstance(BaseModel):
+    region: str
+    instance_family: str
+    provider: str
+    instance_name: str
+    currency: str
+    hourly_cost: float
+    monthly_cost: Optional[float] = None
+    vcpus: int
+    memory_gb: Optional[float] = None
+
+    @field_serializer('monthly_cost', 'memory_gb')
+    def serialize_floats(self, value: Optional[float]):
+        if value is None or math.isnan(value):
+            return None
+        return value
+
+class FleetRequest(BaseModel):
+    vcpus: int = Field(0, ge=0)
+    memory_gb: float = Field(0, ge=0)
+    storage_gb: int = Field(0, ge=0)
+    max_nodes: int = Field(20, ge=1, le=200)
+    providers: Optional[List[str]] = None
+    regions: Optional[List[str]] = None
+    limit: int = Field(5, ge=1, le=50)
+
+    @model_validator(mode="after")
+    def require_capacity(self):
+        if not (self.vcpus or self.memory_gb or self.storage_gb):
+            raise ValueError("At least one of vcpus, memory_gb and storage_gb must be positive.")
+        return self
+
+class FleetItem(BaseModel):
+    instance_name: str
+    count: int
+    hourly_cost: float
+    monthly_cost: Optional[float] = None
+    vcpus: int
+    memory_gb: Optional[float] = None
+    storage_gb: int
+
+    @field_serializer('monthly_cost', 'memory_gb')
+    def serialize_floats(self, value: Optional[float]):
+        if value is None or math.isnan(value):
+            return None
+        return value
+
+class FleetRecommendation(BaseModel):
+    provider: str
+    region: str
+    currency: str
+    nodes: int
+    optimal: bool
+    hourly_cost: float
+    monthly_cost: float
+    hourly_cost_normalized: float
+    monthly_cost_normalized: float
+    vcpus: int
+    memory_gb: float
+    storage_gb: int
+    instances: List[FleetItem]
+
+class PricePoint(BaseModel):
+    recorded_at: datetime
+    hourly_cost: Optional[float] = None
+    monthly_cost: Optional[float] = None
+    currency: Optional[str] = None
+
+    @field_serializer('hourly_cost', 'monthly_cost')
+    def serialize_floats(self, value: Optional[float]):
+        if value is None or math.isnan(value):
+            return None
+        return value
+
+class PriceHistory(BaseModel):
+    provider: str
+    instance_name: str
+    region: str
+    points: List[PricePoint]
+
+class RefreshStatus(BaseModel):
+    provider: str
+    state: str
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    attempts: int
+    rows: int
+    stage_seconds: dict[str, float]
+    last_error: Optional[str] = None
+    last_success_at: Optional[datetime] = None
+
+    model_config = {
+        "from_attributes": True
+    }
+
+class ResultCacheStats(BaseModel):
+    entries: int
+    bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+
+class PoolStats(BaseModel):
+    size: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+
+class FxRate(BaseModel):
+    currency: str
+    rate: float
+    updated_at: datetime
+
 class Metrics(BaseModel):
     total_records: int
     last_updated_times: dict[str, Optional[datetime]]
\ No newline at end of file
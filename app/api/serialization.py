@@ -0,0 +1,72 @@
+import json
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from pydantic import TypeAdapter
+
+from app.api import schemas
+
+INSTANCE_FIELDS = tuple(schemas.VMInstance.model_fields)
+# Columns the schema's field_serializer scrubs of NaN.
+NAN_TO_NULL_FIELDS = (
+    "memory_gb", "hourly_cost", "monthly_cost", "spot_price", "hourly_cost_normalized", "monthly_cost_normalized",
+)
+DATETIME_FIELDS = tuple(
+    name for name, field in schemas.VMInstance.model_fields.items() if field.annotation is datetime
+)
+
+_FLOAT_TYPES = {float, type(None)}
+_datetime_column = TypeAdapter(List[Optional[datetime]])
+
+
+def _float_or_none(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def _encode_column(name: str, values: List[Any]) -> List[Any]:
+    if name in NAN_TO_NULL_FIELDS:
+        # Usually a column of plain floats with no NaN, which needs no per-value work.
+        if set(map(type, values)) <= _FLOAT_TYPES and not any(map(math.isnan, filter(None, values))):
+            return values
+        return [_float_or_none(value) for value in values]
+    if name in DATETIME_FIELDS:
+        # Pydantic's own JSON formatting, so timestamps match the schema's output exactly.
+        return _datetime_column.dump_python(values, mode="json")
+    return values
+
+
+def encode_instances(rows: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Turns plain row mappings into the JSON-ready dicts InstancesResponse would produce,
+    working a column at a time: NaN is scrubbed and timestamps formatted once per
+    column instead of once per field of every row.
+    """
+    if not rows:
+        return []
+    columns = [_encode_column(name, [row[name] for row in rows]) for name in INSTANCE_FIELDS]
+    return [dict(zip(INSTANCE_FIELDS, values)) for values in zip(*columns)]
+
+
+def render_instances_response(result: Dict[str, Any]) -> bytes:
+    """
+    Encodes a get_instances result as the exact bytes FastAPI would send for
+    response_model=InstancesResponse, without validating a model per row. The
+    json.dumps arguments are those of Starlette's JSONResponse.
+    """
+    content = {
+        "total": result["total"],
+        "instances": encode_instances(result["instances"]),
+        "next_cursor": result["next_cursor"],
+        "prev_cursor": result["prev_cursor"],
+    }
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
@@ -0,0 +1,148 @@
+import argparse
+import json
+import random
+import re
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, List
+
+import pandas as pd
+
+from app.api.schemas import VMInstance
+from app.core.config import settings
+from app.data.rows import InstanceRow, validate_batch
+from app.providers import normalization
+
+
+def _legacy_aws_attributes(attrs: dict):
+    """Per-row parsing as AWSProvider did it before the normalization stage."""
+    try:
+        memory_gb = float(str(attrs.get("memory")).replace(" GiB", ""))
+        storage_gb = int(str(attrs.get("storage", "0 GB")).split(" ")[0].replace(",", "")) if "EBS" not in attrs.get("storage", "") else 0
+    except (ValueError, TypeError):
+        return None
+    return memory_gb, storage_gb
+
+
+def _legacy_hetzner_description(lines: List[str]):
+    """Per-product parsing as HetznerBareMetalProvider did it, with uncompiled patterns."""
+    text = " ".join(lines).lower()
+    vcpus = 0
+    for pattern in (r"(\d+)\s*[- ]?core", r"(\d+)\s*x\s*core", r"(\d+)\s*x\s*cpu"):
+        match = re.search(pattern, text)
+        if match:
+            vcpus = int(match.group(1))
+            break
+    memory_gb = None
+    for line in lines:
+        match = re.search(r"(\d+(?:\.\d+)?)\s*GB.*RAM", line, re.IGNORECASE)
+        if match:
+            memory_gb = float(match.group(1))
+            break
+    storage_line = next((line for line in lines if re.search(r"\b(SSD|HDD|NVMe|SATA)\b", line, re.IGNORECASE)), "")
+    match = re.search(r"(\d+)\s*x\s*(\d+(?:\.\d+)?)\s*(TB|GB)", storage_line, re.IGNORECASE)
+    storage_gb = int(int(match.group(1)) * float(match.group(2)) * (1024 if match.group(3).upper() == "TB" else 1)) if match else 0
+    network = next((line.strip() for line in lines if re.search(r"(gbit|mbit)", line, re.IGNORECASE)), None)
+    return vcpus, memory_gb, storage_gb, network
+
+
+def load_aws_attributes(csv_path: str) -> List[dict]:
+    """Rebuilds Pricing API attribute dicts from the AWS rows of a CSV snapshot."""
+    frame = pd.read_csv(csv_path)
+    frame = frame[frame["provider"] == "AWS"]
+    return [
+        {"memory": f"{memory:g} GiB", "storage": storage, "vcpu": str(vcpus)}
+        for memory, storage, vcpus in zip(frame["memory_gb"], frame["storage_type"], frame["vcpus"])
+    ]
+
+
+def load_market_descriptions(market_json: str, products: int) -> List[List[str]]:
+    """Descriptions from a saved /order/server_market/product response, or a synthetic catalogue."""
+    if market_json:
+        with open(market_json, "r", encoding="utf-8") as fp:
+            return [item.get("product", {}).get("description") or [] for item in json.load(fp)]
+
+    rng = random.Random(42)
+    cpus = ["Intel Core i7-6700", "Intel Core i9-9900K", "AMD Ryzen 7 3700X Octa-Core", "Intel Xeon E5-1650V3 6-Core", "AMD Ryzen 5 3600 6 core"]
+    rams = ["2x RAM 16384 MB DDR4", "4x RAM 16384 MB DDR4", "64 GB DDR4 RAM", "128 GB DDR4 ECC RAM"]
+    disks = ["2x SSD SATA 512 GB", "2 x 1 TB NVMe SSD", "2 x 4 TB SATA HDD", "2 x 480 GB SSD"]
+    nics = ["NIC 1 Gbit Intel I219-LM", "1 Gbit/s port"]
+    return [[rng.choice(cpus), rng.choice(rams), rng.choice(disks), rng.choice(nics)] for _ in range(products)]
+
+
+def load_aws_rows(csv_path: str) -> List[dict]:
+    """Constructor arguments for every AWS row of a CSV snapshot."""
+    frame = pd.read_csv(csv_path)
+    frame = frame[frame["provider"] == "AWS"].drop(columns=["spot_price", "last_updated"])
+    now = datetime.utcnow()
+    return [{**record, "last_updated": now} for record in frame.to_dict("records")]
+
+
+def _measure_rows(label: str, kwargs: List[dict], build: Callable[[List[dict]], list]) -> None:
+    """Time and peak traced allocation of building a refresh's insert records."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    records = build(kwargs)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<28} {elapsed * 1000:8.1f} ms  peak {peak / 2**20:6.1f} MiB  ({len(records)} records)")
+
+
+def _pydantic_records(kwargs: List[dict]) -> list:
+    instances = [VMInstance(**item) for item in kwargs]
+    return [instance.model_dump() for instance in instances]
+
+
+def _slots_records(kwargs: List[dict]) -> list:
+    rows = [InstanceRow(**item) for item in kwargs]
+    return [row.as_dict() for row in validate_batch(rows)]
+
+
+def _time(label: str, rows: int, run: Callable[[], None]) -> None:
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {elapsed * 1000:8.1f} ms  ({rows / elapsed:,.0f} rows/sec)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of provider parsing and ingest row building.")
+    parser.add_argument("--csv", default=settings.DATA_FILE_PATH, help="CSV snapshot supplying the AWS attribute set.")
+    parser.add_argument("--market-json", default="", help="Saved Robot server market product list.")
+    parser.add_argument("--market-products", type=int, default=5000, help="Size of the synthetic server market catalogue.")
+    args = parser.parse_args()
+
+    attributes = load_aws_attributes(args.csv)
+    memory_values = [str(attrs.get("memory")) for attrs in attributes]
+    storage_values = [attrs.get("storage", "0 GB") for attrs in attributes]
+    print(f"AWS: {len(attributes)} rows, {len(set(memory_values))} distinct memory / {len(set(storage_values))} distinct storage strings")
+
+    def aws_normalized():
+        normalization.aws_memory_gb.normalize_many(memory_values)
+        normalization.aws_storage_gb.normalize_many(storage_values)
+
+    _time("row by row", len(attributes), lambda: [_legacy_aws_attributes(attrs) for attrs in attributes])
+    normalization.aws_memory_gb.clear()
+    normalization.aws_storage_gb.clear()
+    _time("normalized, cold cache", len(attributes), aws_normalized)
+    _time("normalized, warm cache", len(attributes), aws_normalized)
+
+    descriptions = load_market_descriptions(args.market_json, args.market_products)
+    joined = [normalization.LINE_SEPARATOR.join(lines) for lines in descriptions]
+    print(f"Server market: {len(descriptions)} products, {len(set(joined))} distinct descriptions")
+
+    _time("row by row", len(descriptions), lambda: [_legacy_hetzner_description(lines) for lines in descriptions])
+    normalization.hetzner_hardware.clear()
+    _time("normalized, cold cache", len(descriptions), lambda: normalization.hetzner_hardware.normalize_many(joined))
+    _time("normalized, warm cache", len(descriptions), lambda: normalization.hetzner_hardware.normalize_many(joined))
+
+    kwargs = load_aws_rows(args.csv)
+    print(f"Ingest records: {len(kwargs)} AWS rows")
+    _measure_rows("pydantic + model_dump", kwargs, _pydantic_records)
+    _measure_rows("InstanceRow + validate_batch", kwargs, _slots_records)
+
+
+if __name__ == "__main__":
+    main()
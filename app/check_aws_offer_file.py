@@ -0,0 +1,64 @@
+import asyncio
+import os
+from typing import List
+
+from app.providers.aws_offer_file import iter_offer_file_products
+from app.providers.aws_provider import PRODUCT_FILTERS, AWSProvider
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "aws")
+FILTERS = {item["Field"]: item["Value"] for item in PRODUCT_FILTERS}
+# Chunk sizes small enough that keys, strings and objects straddle buffer refills.
+JSON_CHUNK_SIZES = (1, 7, 16, 1 << 20)
+
+# Of the fixtures' products, a Windows and a Dedicated m5.large and an EBS volume
+# (no operating system at all) are filtered out; the Reserved term is ignored.
+EXPECTED = {
+    ("m5.large", "US East (N. Virginia)"): "0.0960000000",
+    ("c5.xlarge", "EU (Frankfurt)"): "0.1940000000",
+}
+
+
+def _offers(products: List[dict]) -> dict:
+    offers = {}
+    for product in products:
+        attributes = product["product"]["attributes"]
+        (term,) = product["terms"]["OnDemand"].values()
+        (dimension,) = term["priceDimensions"].values()
+        key = (attributes["instanceType"], attributes["location"])
+        assert key not in offers, f"{key} appears twice"
+        offers[key] = dimension["pricePerUnit"]["USD"]
+    return offers
+
+
+def check_offer_file(path: str, chunk_size: int = 1 << 20) -> None:
+    offers = _offers(list(iter_offer_file_products(path, FILTERS, chunk_size)))
+    assert offers == EXPECTED, f"{os.path.basename(path)} at chunk size {chunk_size}: {offers}"
+
+
+def check_provider_rows(path: str) -> None:
+    """The offer file through AWSProvider, down to the ingest rows."""
+    provider = AWSProvider(pricing_client=object(), offer_file_path=path)
+    rows = {(row.instance_name, row.region): row for row in asyncio.run(provider.fetch_data())}
+    assert set(rows) == set(EXPECTED), rows
+    m5 = rows[("m5.large", "US East (N. Virginia)")]
+    assert (m5.vcpus, m5.memory_gb, m5.storage_gb, m5.hourly_cost) == (2, 8.0, 0, 0.096), m5.as_dict()
+
+
+def main():
+    json_path = os.path.join(FIXTURE_DIR, "index.json")
+    csv_path = os.path.join(FIXTURE_DIR, "index.csv")
+
+    for chunk_size in JSON_CHUNK_SIZES:
+        check_offer_file(json_path, chunk_size)
+    print(f"index.json: expected products at chunk sizes {', '.join(map(str, JSON_CHUNK_SIZES))}")
+
+    check_offer_file(csv_path)
+    print("index.csv: expected products")
+
+    for path in (json_path, csv_path):
+        check_provider_rows(path)
+    print("AWSProvider rows from both offer files as expected")
+
+
+if __name__ == "__main__":
+    main()
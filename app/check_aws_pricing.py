@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import copy
+import json
+import os
+import time
+import tracemalloc
+from typing import Callable, List
+
+import boto3
+from botocore.stub import Stubber
+
+from app.providers.aws_provider import PRODUCT_FILTERS, AWSProvider
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "aws", "get_products_pages.json")
+
+
+def load_pages(path: str = FIXTURE_PATH) -> List[dict]:
+    """Recorded get_products responses, in page order, as the Pricing API returned them."""
+    with open(path, "r", encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def stubbed_client(pages: List[dict]):
+    """A pricing client that answers get_products with `pages`, checking each request's filters and token."""
+    client = boto3.client(
+        "pricing", region_name="us-east-1", aws_access_key_id="stub", aws_secret_access_key="stub"
+    )
+    stubber = Stubber(client)
+    token = None
+    for page in pages:
+        expected = {"ServiceCode": "AmazonEC2", "Filters": PRODUCT_FILTERS}
+        if token:
+            expected["NextToken"] = token
+        stubber.add_response("get_products", page, expected)
+        token = page.get("NextToken")
+    stubber.activate()
+    return client, stubber
+
+
+async def _collect_batches(provider: AWSProvider, batch_size: int) -> List[list]:
+    return [batch async for batch in provider.fetch_batches(batch_size)]
+
+
+def check_recorded_pages() -> None:
+    """Runs the recorded pages through fetch_batches and checks the batches and rows it yields."""
+    client, stubber = stubbed_client(load_pages())
+    batches = asyncio.run(_collect_batches(AWSProvider(pricing_client=client), batch_size=2))
+    stubber.assert_no_pending_responses()
+
+    # Two products per batch; the last page holds only a zero price and a product
+    # without OnDemand terms, so it yields no batch at all.
+    assert [[row.instance_name for row in batch] for batch in batches] == [
+        ["m5.large", "m5d.large"],
+        ["c5.xlarge", "t3.micro"],
+    ], batches
+
+    rows = {(row.instance_name, row.region): row for batch in batches for row in batch}
+    m5 = rows[("m5.large", "US East (N. Virginia)")]
+    assert (m5.provider, m5.vcpus, m5.memory_gb, m5.storage_gb) == ("AWS", 2, 8.0, 0)
+    assert (m5.hourly_cost, m5.currency, m5.instance_family) == (0.096, "USD", "General purpose")
+    assert abs(m5.monthly_cost - 0.096 * 730) < 1e-9
+    assert rows[("c5.xlarge", "EU (Frankfurt)")].hourly_cost == 0.194
+    assert rows[("t3.micro", "US East (N. Virginia)")].memory_gb == 1.0
+    print(f"recorded pages: {len(batches)} batches, {len(rows)} rows as expected")
+
+
+def synthetic_pages(products: int, page_size: int = 100) -> List[dict]:
+    """`products` priced products in Pricing API pages, cloned from the recorded m5.large entry."""
+    template = json.loads(load_pages()[0]["PriceList"][0])
+    price_list = []
+    for number in range(products):
+        product = copy.deepcopy(template)
+        product["product"]["attributes"]["instanceType"] = f"m5.large{number}"
+        price_list.append(json.dumps(product))
+
+    pages = []
+    for start in range(0, products, page_size):
+        page = {"FormatVersion": "aws_v1", "PriceList": price_list[start:start + page_size]}
+        if start + page_size < products:
+            page["NextToken"] = f"page-{start // page_size + 2}"
+        pages.append(page)
+    return pages
+
+
+def _measure(label: str, pages: List[dict], run: Callable[[AWSProvider], int]) -> None:
+    """Wall time and peak traced allocation of one refresh over the stubbed pages."""
+    client, _ = stubbed_client(pages)
+    provider = AWSProvider(pricing_client=client)
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = run(provider)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<28} {elapsed * 1000:8.1f} ms  peak {peak / 2**20:6.1f} MiB  ({rows} rows)")
+
+
+def _whole_refresh(provider: AWSProvider) -> int:
+    """Holds every row of the refresh at once, as the ingest did before batching."""
+    return len(asyncio.run(provider.fetch_data()))
+
+
+def _streamed_refresh(provider: AWSProvider, batch_size: int) -> int:
+    """Consumes the refresh batch by batch, as the orchestrator's spool does."""
+    async def consume() -> int:
+        rows = 0
+        async for batch in provider.fetch_batches(batch_size):
+            rows += len(batch)
+        return rows
+
+    return asyncio.run(consume())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline checks of the AWS Pricing API ingest, through botocore's Stubber.")
+    parser.add_argument("--products", type=int, default=0, help="Also compare a whole and a streamed refresh of this many synthetic products.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per batch for the streamed refresh.")
+    args = parser.parse_args()
+
+    check_recorded_pages()
+
+    if args.products:
+        pages = synthetic_pages(args.products)
+        print(f"Synthetic refresh: {args.products} products in {len(pages)} pages")
+        _measure("whole refresh (fetch_data)", pages, _whole_refresh)
+        _measure("streamed batches", pages, lambda provider: _streamed_refresh(provider, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import asyncio
+import json
+from email.utils import formatdate
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.providers import http_client
+from app.providers.base_provider import ProviderDataUnchanged
+from app.providers.hetzner_bare_metal_provider import HetznerBareMetalProvider
+from app.providers.hetzner_cloud_provider import HetznerCloudProvider
+
+CLOUD_URL = "https://cloud.stub/v1"
+ROBOT_URL = "https://robot.stub"
+SERVER_TYPE_PAGES = 3
+
+
+def _server_type(number: int) -> dict:
+    return {
+        "name": f"cx{number}2",
+        "cores": number,
+        "memory": 2.0 * number,
+        "disk": 20 * number,
+        "storage_type": "local",
+        "cpu_type": "shared",
+        "architecture": "x86",
+        "prices": [
+            {"location": "fsn1", "price_hourly": {"net": f"{0.005 * number:.4f}"}, "price_monthly": {"net": f"{3.5 * number:.2f}"}},
+            {"location": "hel1", "price_hourly": {"net": f"{0.005 * number:.4f}"}, "price_monthly": {"net": f"{3.5 * number:.2f}"}},
+        ],
+    }
+
+
+class StubServer:
+    """
+    Hetzner Cloud and Robot endpoints behind an httpx.MockTransport. Every document
+    has a version; its ETag (or, for the Robot endpoints, Last-Modified) follows the
+    version and a matching validator is answered with 304. Requests are recorded,
+    and so is the largest number of /server_types pages in flight at once.
+    """
+
+    def __init__(self):
+        self.versions: Dict[str, int] = {}
+        self.requests: List[httpx.Request] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _document(self, request: httpx.Request) -> Optional[dict]:
+        path = request.url.path
+        if path == "/v1/server_types":
+            page = int(request.url.params["page"])
+            return {
+                "server_types": [_server_type(page * 10 + offset) for offset in range(2)],
+                "meta": {"pagination": {
+                    "page": page, "per_page": 50, "previous_page": page - 1 or None,
+                    "next_page": page + 1 if page < SERVER_TYPE_PAGES else None, "last_page": SERVER_TYPE_PAGES,
+                }},
+            }
+        if path == "/v1/pricing":
+            return {"pricing": {"currency": "EUR"}}
+        if path == "/order/currency":
+            return {"currency": "EUR"}
+        if path == "/order/server/product":
+            return [{"product": {
+                "id": "AX41-NVMe",
+                "description": ["AMD Ryzen 5 3600 6 core", "64 GB DDR4 RAM", "2 x 512 GB NVMe SSD", "1 Gbit/s port"],
+                "prices": [{"location": "FSN1", "price": {"net": "39.00", "hourly_net": "0.0625"}}],
+            }}]
+        return None
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        document = self._document(request)
+        if document is None:
+            return httpx.Response(404)
+
+        key = str(request.url)
+        version = self.versions.setdefault(key, 1)
+        if request.url.host == "robot.stub":
+            validator = formatdate(1_700_000_000 + version * 86400, usegmt=True)
+            header, conditional = "Last-Modified", "If-Modified-Since"
+        else:
+            validator = f'"v{version}"'
+            header, conditional = "ETag", "If-None-Match"
+
+        paged = request.url.path == "/v1/server_types"
+        if paged:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Long enough for concurrent page requests to overlap.
+            await asyncio.sleep(0.02)
+        finally:
+            if paged:
+                self.in_flight -= 1
+
+        if request.headers.get(conditional) == validator:
+            return httpx.Response(304, headers={header: validator})
+        return httpx.Response(200, headers={header: validator}, content=json.dumps(document).encode())
+
+    def change(self, url: str) -> None:
+        self.versions[url] = self.versions.get(url, 1) + 1
+
+    def take_requests(self) -> List[httpx.Request]:
+        requests, self.requests = self.requests, []
+        return requests
+
+
+def _conditional(requests: List[httpx.Request]) -> List[bool]:
+    return [("If-None-Match" in request.headers or "If-Modified-Since" in request.headers) for request in requests]
+
+
+async def check_cloud(server: StubServer) -> None:
+    provider = HetznerCloudProvider(base_url=CLOUD_URL)
+
+    # First refresh: every page is fetched, the later ones concurrently.
+    rows = await provider.fetch_data()
+    assert len(rows) == SERVER_TYPE_PAGES * 2 * 2, len(rows)
+    assert server.max_in_flight >= SERVER_TYPE_PAGES - 1, server.max_in_flight
+    requests = server.take_requests()
+    assert sorted(request.url.params.get("page") for request in requests if request.url.path.endswith("/server_types")) == ["1", "2", "3"]
+    assert not any(_conditional(requests))
+
+    # The write failed (on_refresh_committed never ran): nothing is revalidated,
+    # so the retry fetches and rebuilds everything.
+    rows = await provider.fetch_data()
+    assert len(rows) == SERVER_TYPE_PAGES * 2 * 2
+    assert not any(_conditional(server.take_requests()))
+
+    # Written and committed: the next refresh revalidates and every endpoint answers 304.
+    provider.on_refresh_committed()
+    try:
+        await provider.fetch_data()
+    except ProviderDataUnchanged:
+        pass
+    else:
+        raise AssertionError("an all-304 refresh must raise ProviderDataUnchanged")
+    assert all(_conditional(server.take_requests()))
+
+    # One page changes: the refresh goes through and the 304 pages come from the cache.
+    server.change(f"{CLOUD_URL}/server_types?page=2&per_page=50")
+    rows = await provider.fetch_data()
+    assert len(rows) == SERVER_TYPE_PAGES * 2 * 2, len(rows)
+    assert {row.instance_name for row in rows} == {f"cx{page * 10 + offset}2" for page in range(1, 4) for offset in range(2)}
+    server.take_requests()
+    print(f"Hetzner Cloud: 200, retry after a failed write, 304, partial change; up to {server.max_in_flight} pages in flight")
+
+
+async def check_bare_metal(server: StubServer) -> None:
+    provider = HetznerBareMetalProvider(base_url=ROBOT_URL)
+
+    rows = await provider.fetch_data()
+    assert [(row.instance_name, row.region, row.monthly_cost) for row in rows] == [("AX41-NVMe", "FSN1", 39.0)]
+    assert not any(_conditional(server.take_requests()))
+
+    provider.on_refresh_committed()
+    try:
+        await provider.fetch_data()
+    except ProviderDataUnchanged:
+        pass
+    else:
+        raise AssertionError("an all-304 refresh must raise ProviderDataUnchanged")
+    assert all("If-Modified-Since" in request.headers for request in server.take_requests())
+    print("Hetzner Bare Metal: 200, then 304 via Last-Modified")
+
+
+async def main() -> None:
+    settings.HETZNER_CLOUD_API_TOKEN = "stub"
+    settings.HETZNER_ROBOT_USERNAME = "stub"
+    settings.HETZNER_ROBOT_PASSWORD = "stub"
+    settings.HETZNER_INCLUDE_SERVER_MARKET = False
+
+    server = StubServer()
+    # Stands in for the shared client, so both providers talk to the stub.
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(server.handle))
+    try:
+        await check_cloud(server)
+        await check_bare_metal(server)
+    finally:
+        await http_client.close_http_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,21 +1,98 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     APP_NAME: str = "Cloud Pricing API"
     LOG_LEVEL: str = "INFO"
 
     DATABASE_URL: str
+    # Read-only endpoints are spread round-robin over these replicas; ingests, the
+    # snapshot reload and leader election always use DATABASE_URL. Empty reads from it too.
+    DATABASE_READ_REPLICA_URLS: List[str] = []
+    # After an ingest, reads stay on the primary this long so a lagging replica's
+    # rows are not cached (or ETagged) as the new dataset version.
+    DB_REPLICA_HOLD_SECONDS: float = 10
+
+    # Logs every SQL statement; for debugging only.
+    DB_ECHO: bool = False
+    # Connections kept per engine and per process, extra ones allowed under load, how
+    # long a request waits for one before failing, and the age at which one is replaced.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    # Test each connection with a round trip on checkout; for networks that drop idle connections.
+    DB_POOL_PRE_PING: bool = False
+    # Prepared statements asyncpg keeps per connection; set 0 behind PgBouncer in
+    # transaction pooling mode, which cannot keep prepared statements.
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500
 
     CORS_ORIGINS: List[str] = ["http://localhost:5173"]
 
     SUPPORTED_PROVIDERS: List[str] = ["AWS", "GCP", "Azure", "DigitalOcean", "Linode", "Vultr", "PhoenixNAP", "Equinix Metal", "Hetzner Cloud", "Hetzner Bare Metal", "OVHcloud", "Scaleway"]
     DATA_FILE_PATH: str = "data/vm_pricing.csv"
+
+    # "database" queries PostgreSQL per request, "memory" serves /instances from an
+    # in-process columnar snapshot rebuilt after every provider refresh.
+    READ_ENGINE: str = "database"
+
+    # "diff" writes only inserted/changed/removed rows and logs price changes to
+    # price_history; "replace" deletes and re-inserts every row of the provider;
+    # "swap" builds the refreshed table in a staging copy and renames it into place.
+    INGEST_MODE: str = "diff"
+    # Rows parsed and written per batch while streaming a provider refresh.
+    INGEST_BATCH_SIZE: int = 1000
+    # Directory for the temporary files a refresh is spooled to before it is written;
+    # empty uses the system default.
+    INGEST_SPOOL_DIR: str = ""
+    # Rows fetched from the server-side cursor and encoded per chunk by /instances/export.
+    EXPORT_BATCH_SIZE: int = 2000
     
+    # Currency every price is also stored in (hourly_cost_normalized, monthly_cost_normalized);
+    # cost filters and sorts compare those, so providers billing in different currencies rank correctly.
+    REFERENCE_CURRENCY: str = "USD"
+    # Daily reference rates (ECB XML format) loaded into the fx_rates table every
+    # REFRESH_INTERVAL_FX_RATES hours; empty leaves the table to be maintained by hand.
+    FX_RATES_URL: str = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-daily.xml"
+
     REFRESH_INTERVAL_AWS: int = 12
     REFRESH_INTERVAL_GCP: int = 12
     REFRESH_INTERVAL_HETZNER_CLOUD: int = 12
     REFRESH_INTERVAL_HETZNER_BARE_METAL: int = 24
+    REFRESH_INTERVAL_FX_RATES: int = 24
+
+    # Refresh orchestration: concurrent provider fetches, per-attempt fetch timeout,
+    # retries after the first attempt and the base of the exponential backoff.
+    REFRESH_MAX_CONCURRENCY: int = 2
+    REFRESH_TIMEOUT_SECONDS: float = 1800
+    # Per-provider fetch timeouts by provider name, e.g. {"AWS": 3600}; they take
+    # precedence over a provider's own budget and REFRESH_TIMEOUT_SECONDS.
+    REFRESH_TIMEOUT_SECONDS_BY_PROVIDER: Dict[str, float] = {}
+    # Parsed batches buffered between a provider's fetch and its spool; the fetch
+    # waits when the buffer is full.
+    REFRESH_QUEUE_MAX_BATCHES: int = 4
+    REFRESH_MAX_RETRIES: int = 2
+    REFRESH_RETRY_BACKOFF_SECONDS: float = 30
+
+    # With several worker processes, elect one (via a PostgreSQL advisory lock) to run
+    # the refresh scheduler; the rest retry every LEADER_POLL_SECONDS and reload their
+    # caches when notified of an ingest. When disabled every process runs the scheduler.
+    SCHEDULER_LEADER_ELECTION: bool = True
+    LEADER_POLL_SECONDS: float = 15
+
+    # Path to a locally mirrored EC2 offer file (JSON or CSV); when set, the AWS
+    # provider reads it instead of calling the Pricing API.
+    AWS_OFFER_FILE_PATH: str = ""
+
+    # Memory budget of the /instances result cache (pages and totals per normalized
+    # query, dropped on every ingest); 0 disables it.
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Read endpoints are tagged with an ETag derived from the dataset version and the
+    # query; clients and proxies may reuse a response for this long before revalidating.
+    HTTP_CACHE_MAX_AGE_SECONDS: int = 60
+    # Responses larger than this many bytes are gzip-compressed when the client accepts it.
+    GZIP_MINIMUM_SIZE: int = 1000
 
     HETZNER_CLOUD_API_TOKEN: str = ""
     HETZNER_ROBOT_USERNAME: str = ""
@@ -0,0 +1,364 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Prometheus text exposition format, version 0.0.4.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+STAGE_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """
+    A metric family. Everything is updated from the event loop thread (SQLAlchemy's
+    async events run in greenlets on that same thread), so no locking is needed.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labelvalues: Sequence[str]) -> LabelValues:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labelvalues)}")
+        return tuple(str(value) for value in labelvalues)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        pass
+
+    def render(self) -> List[str]:
+        documentation = self.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+        lines = [f"# HELP {self.name} {documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labelnames, labelvalues, value in self.samples():
+            lines.append(f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        key = self._key(labelvalues)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        for key in sorted(self._values):
+            yield self.name, self.labelnames, key, self._values[key]
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down. With `collect`, the values are read when the
+    registry is rendered instead of being set: it returns either a number (for an
+    unlabelled gauge) or a mapping of label value tuples to numbers.
+    """
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], object]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        self._values[self._key(labelvalues)] = float(value)
+
+    def samples(self):
+        values = self._values
+        if self._collect is not None:
+            collected = self._collect()
+            values = collected if isinstance(collected, dict) else {(): collected}
+        for key in sorted(values):
+            yield self.name, self.labelnames, key, float(values[key])
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: non-cumulative bucket counts, then the sum of observations.
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        key = self._key(labelvalues)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0.0] * (len(self.buckets) + 1)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-1] += value
+
+    def samples(self):
+        bucket_labels = self.labelnames + ("le",)
+        for key in sorted(self._series):
+            series = self._series[key]
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket", bucket_labels, key + (_format_value(bound),), cumulative
+            yield f"{self.name}_sum", self.labelnames, key, series[-1]
+            yield f"{self.name}_count", self.labelnames, key, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), collect=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, collect))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> bytes:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response, by route template.",
+    ("method", "route", "status"),
+)
+http_request_db_duration = registry.histogram(
+    "http_request_db_duration_seconds",
+    "Time spent executing SQL while handling a request, by route template.",
+    ("method", "route"),
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds",
+    "Execution time of SQL statements, by statement keyword.",
+    ("operation",),
+)
+db_query_rows = registry.histogram(
+    "db_query_rows",
+    "Rows returned or affected per SQL statement, by statement keyword.",
+    ("operation",),
+    buckets=ROW_BUCKETS,
+)
+db_pool_checkout_duration = registry.histogram(
+    "db_pool_checkout_duration_seconds",
+    "Time spent obtaining a connection from the pool, including waiting for a free one or opening a new one.",
+    ("engine",),
+)
+refresh_stage_duration = registry.histogram(
+    "refresh_stage_duration_seconds",
+    "Duration of each stage (fetch, parse, backpressure, write) of a provider refresh.",
+    ("provider", "stage"),
+    buckets=STAGE_BUCKETS,
+)
+refresh_runs = registry.counter(
+    "refresh_runs_total",
+    "Provider refreshes by final state (succeeded, empty, unchanged, failed).",
+    ("provider", "state"),
+)
+refresh_rows = registry.gauge(
+    "refresh_rows",
+    "Rows ingested by the latest refresh of each provider.",
+    ("provider",),
+)
+
+
+class _RequestTimings:
+    __slots__ = ("db_seconds",)
+
+    def __init__(self):
+        self.db_seconds = 0.0
+
+
+# Set per request by PrometheusMiddleware; SQL executed while handling it adds to db_seconds.
+_request_timings: ContextVar[Optional[_RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def _operation(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword.isalpha() else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Times every statement the engine executes and counts the rows it returns or affects."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        operation = _operation(statement)
+        db_query_duration.observe(elapsed, operation)
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            db_query_rows.observe(cursor.rowcount, operation)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.db_seconds += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        # The statement failed, so after_cursor_execute will not run for it.
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """The default async pool, timing how long each checkout takes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.engine_name = "primary"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            db_pool_checkout_duration.observe(time.perf_counter() - started, self.engine_name)
+
+    def recreate(self):
+        # Engine.dispose() swaps in a recreated pool; keep its label.
+        pool = super().recreate()
+        pool.engine_name = self.engine_name
+        return pool
+
+
+def pool_stats(pool: Pool) -> Dict[str, int]:
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # QueuePool counts overflow from -size upwards; only connections beyond the size are reported.
+        "overflow": max(pool.overflow(), 0),
+    }
+
+
+# Engines whose pools the db_pool_* gauges report, by name ("primary", "replica0", ...).
+_engines: Dict[str, AsyncEngine] = {}
+
+
+def register_pool(name: str, engine: AsyncEngine) -> None:
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.engine_name = name
+    _engines[name] = engine
+
+
+def _collect_pool_stat(stat: str) -> Callable[[], Dict[LabelValues, int]]:
+    return lambda: {(name,): pool_stats(engine.pool)[stat] for name, engine in _engines.items()}
+
+
+registry.gauge("db_pool_size", "Configured size of the connection pool.", ("engine",), _collect_pool_stat("size"))
+registry.gauge("db_pool_checked_out", "Connections currently checked out of the pool.", ("engine",), _collect_pool_stat("checked_out"))
+registry.gauge("db_pool_checked_in", "Idle connections held by the pool.", ("engine",), _collect_pool_stat("checked_in"))
+registry.gauge("db_pool_overflow", "Connections open beyond the pool size.", ("engine",), _collect_pool_stat("overflow"))
+
+
+class PrometheusMiddleware:
+    """
+    Records the latency of every HTTP request, labelled with the matched route's
+    path template (so /instances?... and /instances?... share a series) and the SQL
+    time spent handling it. Requests that match no route are labelled "unmatched".
+    Timing stops at the last body chunk, so streamed responses are measured in full.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = _RequestTimings()
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        status = "500"
+        recorded = False
+
+        def record() -> None:
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe(time.perf_counter() - started, scope["method"], path, status)
+            http_request_db_duration.observe(timings.db_seconds, scope["method"], path)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            record()
+            _request_timings.reset(token)
@@ -0,0 +1,145 @@
+import logging
+from datetime import datetime
+from typing import Any, List, Sequence, Tuple
+
+import pandas as pd
+from sqlalchemy import Column, Index, MetaData, Table, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+STAGING_SUFFIX = "_staging"
+
+LIVE_TABLE: Table = models.VMInstance.__table__
+# Every column except the serial primary key, in table order.
+LOAD_COLUMNS: List[Column] = [column for column in LIVE_TABLE.columns if not column.primary_key]
+
+
+def staging_table(table: Table = LIVE_TABLE) -> Table:
+    """Lightweight Table for <table>_staging, carrying the same columns and suffixed index names."""
+    metadata = MetaData()
+    staging = Table(
+        f"{table.name}{STAGING_SUFFIX}",
+        metadata,
+        *[Column(column.name, column.type) for column in table.columns],
+    )
+    for index in table.indexes:
+        Index(
+            f"{index.name}{STAGING_SUFFIX}",
+            *[staging.c[column.name] for column in index.columns],
+            **index.dialect_kwargs,
+        )
+    return staging
+
+
+def frame_to_records(frame: pd.DataFrame, columns: Sequence[Column] = LOAD_COLUMNS) -> List[Tuple[Any, ...]]:
+    """
+    Converts a DataFrame chunk to tuples in column order, coercing each column to the
+    Python type its SQL type expects (asyncpg's binary COPY does not coerce) and
+    mapping NaN/NaT to None.
+    """
+    values = []
+    for column in columns:
+        if column.name in frame:
+            series = frame[column.name]
+        else:
+            series = pd.Series([None] * len(frame), index=frame.index, dtype=object)
+
+        python_type = column.type.python_type
+        if python_type is datetime:
+            series = pd.to_datetime(series, errors="coerce")
+            values.append([None if pd.isna(value) else value.to_pydatetime() for value in series])
+        else:
+            values.append([None if pd.isna(value) else python_type(value) for value in series])
+
+    return list(zip(*values))
+
+
+async def write_records(
+    conn: AsyncConnection,
+    table: Table,
+    records: Sequence[Tuple[Any, ...]],
+    columns: Sequence[Column] = LOAD_COLUMNS,
+    use_copy: bool = True,
+) -> int:
+    """
+    Appends records to a table with PostgreSQL COPY when the driver is asyncpg,
+    falling back to a multi-row executemany INSERT otherwise (or when use_copy is False).
+    """
+    if not records:
+        return 0
+
+    names = [column.name for column in columns]
+
+    if use_copy:
+        raw_connection = await conn.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        if hasattr(driver_connection, "copy_records_to_table"):
+            await driver_connection.copy_records_to_table(table.name, records=records, columns=names)
+            return len(records)
+        logger.info("Driver does not support COPY; falling back to executemany.")
+
+    await conn.execute(table.insert(), [dict(zip(names, record)) for record in records])
+    return len(records)
+
+
+async def create_staging_table(conn: AsyncConnection, table: Table = LIVE_TABLE) -> Table:
+    """
+    (Re)creates an empty, index-free <table>_staging shaped like the live table.
+    Defaults are copied, so ids keep coming from the live table's sequence.
+    """
+    staging = staging_table(table)
+    await conn.execute(text(f"DROP TABLE IF EXISTS {staging.name}"))
+    await conn.execute(text(f"CREATE TABLE {staging.name} (LIKE {table.name} INCLUDING DEFAULTS)"))
+    return staging
+
+
+async def index_staging_table(conn: AsyncConnection, table: Table = LIVE_TABLE) -> None:
+    """Adds the primary key, foreign keys and every live index to the loaded staging table, then ANALYZEs it."""
+    staging = staging_table(table)
+    await conn.execute(
+        text(f"ALTER TABLE {staging.name} ADD CONSTRAINT {table.name}_pkey{STAGING_SUFFIX} PRIMARY KEY (id)")
+    )
+    for constraint in table.foreign_key_constraints:
+        referred = constraint.referred_table
+        await conn.execute(text(
+            f"ALTER TABLE {staging.name} ADD CONSTRAINT {constraint.name}{STAGING_SUFFIX} "
+            f"FOREIGN KEY ({', '.join(constraint.column_keys)}) "
+            f"REFERENCES {referred.name} ({', '.join(element.column.name for element in constraint.elements)})"
+        ))
+    for index in staging.indexes:
+        await conn.run_sync(index.create)
+    await conn.execute(text(f"ANALYZE {staging.name}"))
+
+
+async def swap_staging_table(conn: AsyncConnection, table: Table = LIVE_TABLE, lock_timeout: str = "5s") -> None:
+    """
+    Replaces the live table with its staging copy. Run inside a transaction: readers see
+    either the old or the new table, and are blocked only for the catalog renames.
+    """
+    staging = staging_table(table)
+    retired = f"{table.name}_retired"
+
+    await conn.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+    sequence = await conn.scalar(text(f"SELECT pg_get_serial_sequence('{table.name}', 'id')"))
+
+    await conn.execute(text(f"DROP TABLE IF EXISTS {retired}"))
+    await conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {retired}"))
+    await conn.execute(text(f"ALTER TABLE {staging.name} RENAME TO {table.name}"))
+    if sequence:
+        # The serial sequence is owned by the retired table; hand it over before dropping it.
+        await conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table.name}.id"))
+    await conn.execute(text(f"DROP TABLE {retired}"))
+
+    await conn.execute(
+        text(f"ALTER TABLE {table.name} RENAME CONSTRAINT {table.name}_pkey{STAGING_SUFFIX} TO {table.name}_pkey")
+    )
+    for constraint in table.foreign_key_constraints:
+        await conn.execute(
+            text(f"ALTER TABLE {table.name} RENAME CONSTRAINT {constraint.name}{STAGING_SUFFIX} TO {constraint.name}")
+        )
+    for index in table.indexes:
+        await conn.execute(text(f"ALTER INDEX {index.name}{STAGING_SUFFIX} RENAME TO {index.name}"))
+
@@ -0,0 +1,326 @@
+import hashlib
+from functools import cached_property
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.data.name_index import NameIndex
+from app.data.pagination import Cursor, build_page, scans_ascending
+from app.data.rollups import PriceRollups
+from app.data.skyline import pareto_mask
+
+CATEGORICAL_COLUMNS = ("provider", "region", "instance_family", "storage_type", "instance_name", "currency")
+NUMERIC_COLUMNS = (
+    "vcpus", "memory_gb", "storage_gb", "hourly_cost", "monthly_cost", "hourly_cost_normalized", "monthly_cost_normalized",
+)
+# Capacities an instance is compared on, besides its hourly price, for the skyline.
+SKYLINE_COLUMNS = ("vcpus", "memory_gb", "storage_gb")
+# Each sort_by of /instances and the column it orders by; prices in the reference currency.
+SORT_COLUMNS = {"hourly_cost": "hourly_cost_normalized", "vcpus": "vcpus", "memory_gb": "memory_gb"}
+FACET_COLUMNS = (
+    ("provider", "providers"),
+    ("region", "regions"),
+    ("instance_family", "instance_families"),
+    ("storage_type", "storage_types"),
+)
+
+
+class ColumnStore:
+    """
+    Immutable, NumPy-backed snapshot of the vm_instances table.
+
+    String columns are dictionary encoded (sorted categories + int32 codes, -1 for NULL),
+    numeric columns are float64 arrays with NaN for NULL. Every supported sort order is
+    precomputed at build time so a query is a handful of vectorized mask operations,
+    and the distinct values behind the filter dropdowns fall out of the encoding.
+    A new snapshot is built after each ingest and swapped in by reference.
+
+    `version` is a digest of the rows (given in id order), so it changes exactly
+    when the data does and is the same in every process holding the same data.
+    """
+
+    def __init__(self, rows: Sequence[Dict[str, Any]]):
+        self.rows: List[Dict[str, Any]] = list(rows)
+        self.size = len(self.rows)
+        self.version = hashlib.blake2b(
+            repr([tuple(row.values()) for row in self.rows]).encode("utf-8"), digest_size=8
+        ).hexdigest()
+        self.ids = np.fromiter((row["id"] for row in self.rows), dtype=np.int64, count=self.size)
+
+        self.categories: Dict[str, List[str]] = {}
+        self.codes: Dict[str, np.ndarray] = {}
+        for column in CATEGORICAL_COLUMNS:
+            self.categories[column], self.codes[column] = self._encode([row[column] for row in self.rows])
+
+        self.numeric: Dict[str, np.ndarray] = {
+            column: np.fromiter(
+                (np.nan if row[column] is None else row[column] for row in self.rows),
+                dtype=np.float64,
+                count=self.size,
+            )
+            for column in NUMERIC_COLUMNS
+        }
+
+        self.name_index = NameIndex(self.categories["instance_name"])
+        self._orders = {sort_by: self._sort_permutation(column) for sort_by, column in SORT_COLUMNS.items()}
+
+        self._regions_by_provider: Dict[str, List[str]] = {}
+        pairs = np.unique(np.stack([self.codes["provider"], self.codes["region"]]), axis=1)
+        for provider_code, region_code in pairs.T:
+            if provider_code >= 0 and region_code >= 0:
+                provider = self.categories["provider"][provider_code]
+                self._regions_by_provider.setdefault(provider, []).append(self.categories["region"][region_code])
+
+        self._narrow_skylines: Dict[Tuple[str, ...], Dict[Tuple[str, str], np.ndarray]] = {}
+
+        self._providers_by_name: Dict[int, List[str]] = {}
+        pairs = np.unique(np.stack([self.codes["instance_name"], self.codes["provider"]]), axis=1)
+        for name_code, provider_code in pairs.T:
+            if name_code >= 0 and provider_code >= 0:
+                self._providers_by_name.setdefault(int(name_code), []).append(self.categories["provider"][provider_code])
+
+    @staticmethod
+    def _encode(values: List[Optional[str]]):
+        categories = sorted({value for value in values if value is not None})
+        lookup = {value: code for code, value in enumerate(categories)}
+        codes = np.fromiter(
+            (lookup.get(value, -1) for value in values),
+            dtype=np.int32,
+            count=len(values),
+        )
+        return categories, codes
+
+    def _sort_permutation(self, column: str) -> np.ndarray:
+        # Ascending (value, id) with NULLs last, as in PostgreSQL. DESC is the reverse permutation.
+        values = self.numeric[column]
+        return np.lexsort((self.ids, values, np.isnan(values)))
+
+    def _keyset_mask(self, column: str, cursor: Cursor, greater: bool) -> np.ndarray:
+        values = self.numeric[column]
+        nulls = np.isnan(values)
+        if greater:
+            if cursor.value is None:
+                return nulls & (self.ids > cursor.id)
+            return nulls | (values > cursor.value) | ((values == cursor.value) & (self.ids > cursor.id))
+        if cursor.value is None:
+            return ~nulls | (self.ids < cursor.id)
+        return ~nulls & ((values < cursor.value) | ((values == cursor.value) & (self.ids < cursor.id)))
+
+    def _codes_for(self, column: str, values: List[str]) -> np.ndarray:
+        lookup = self.categories[column]
+        wanted = set(values)
+        return np.array([code for code, value in enumerate(lookup) if value in wanted], dtype=np.int32)
+
+    def _filter_masks(
+        self,
+        providers: Optional[List[str]] = None,
+        regions: Optional[List[str]] = None,
+        instance_families: Optional[List[str]] = None,
+        storage_types: Optional[List[str]] = None,
+        min_vcpus: Optional[int] = None,
+        min_memory: Optional[float] = None,
+        min_storage: Optional[int] = None,
+        max_monthly_cost: Optional[float] = None,
+        instance_name: Optional[str] = None,
+        skyline_only: bool = False,
+    ) -> Dict[str, np.ndarray]:
+        """One boolean mask per active filter, keyed by the column it constrains."""
+        masks: Dict[str, np.ndarray] = {}
+
+        for column, values in (
+            ("provider", providers),
+            ("region", regions),
+            ("instance_family", instance_families),
+            ("storage_type", storage_types),
+        ):
+            if values:
+                masks[column] = np.isin(self.codes[column], self._codes_for(column, values))
+
+        if min_vcpus:
+            masks["vcpus"] = self.numeric["vcpus"] >= min_vcpus
+        if min_memory:
+            masks["memory_gb"] = self.numeric["memory_gb"] >= min_memory
+        if min_storage:
+            masks["storage_gb"] = self.numeric["storage_gb"] >= min_storage
+        if max_monthly_cost is not None:
+            masks["monthly_cost"] = self.numeric["monthly_cost_normalized"] <= max_monthly_cost
+        if instance_name:
+            masks["instance_name"] = np.isin(self.codes["instance_name"], self.name_index.matching_codes(instance_name))
+        if skyline_only:
+            masks["skyline"] = self.skyline_mask
+
+        return masks
+
+    def _combine(self, masks: List[np.ndarray]) -> np.ndarray:
+        combined = np.ones(self.size, dtype=bool)
+        for mask in masks:
+            combined &= mask
+        return combined
+
+    def filter_mask(self, **filters: Any) -> np.ndarray:
+        """Boolean mask of rows matching the same filters as data_manager.get_instances."""
+        return self._combine(list(self._filter_masks(**filters).values()))
+
+    def filter_options(self) -> Dict[str, List[str]]:
+        return {
+            "providers": [value for value in self.categories["provider"] if value],
+            "regions": [value for value in self.categories["region"] if value],
+            "instance_families": [value for value in self.categories["instance_family"] if value],
+            "storage_types": [value for value in self.categories["storage_type"] if value],
+        }
+
+    def regions_for(self, provider: Optional[str] = None) -> List[str]:
+        if not provider:
+            return list(self.categories["region"])
+        return self._regions_by_provider.get(provider, [])
+
+    def autocomplete(self, query: str, limit: int = 10, providers: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        """Top (instance_name, provider) pairs whose name contains query, best matches first."""
+        wanted = set(providers) if providers else None
+        suggestions: List[Dict[str, str]] = []
+        for code in self.name_index.rank(query):
+            for provider in self._providers_by_name.get(code, []):
+                if wanted is None or provider in wanted:
+                    suggestions.append({"instance_name": self.name_index.names[code], "provider": provider})
+                    if len(suggestions) >= limit:
+                        return suggestions
+        return suggestions
+
+    def facets(self, **filters: Any) -> Dict[str, Any]:
+        """
+        Per-value counts for each facet column under the given filters. A column's own
+        IN-list is left out when counting that column, so the counts show how many rows
+        each alternative value would match (the usual drill-down facet semantics).
+        """
+        masks = self._filter_masks(**filters)
+        result: Dict[str, Any] = {"total": int(np.count_nonzero(self._combine(list(masks.values()))))}
+
+        for column, key in FACET_COLUMNS:
+            mask = self._combine([m for name, m in masks.items() if name != column])
+            codes = self.codes[column][mask]
+            counts = np.bincount(codes[codes >= 0], minlength=len(self.categories[column]))
+            result[key] = [
+                {"value": value, "count": int(count)}
+                for value, count in zip(self.categories[column], counts)
+                if value
+            ]
+
+        return result
+
+    @cached_property
+    def price_rollups(self) -> PriceRollups:
+        return PriceRollups(self)
+
+    @cached_property
+    def skylines(self) -> Dict[Tuple[str, str], np.ndarray]:
+        """
+        Per (provider, region), the indices of the priced rows that no other row of the
+        group beats, i.e. costs no more per hour with at least as many vCPUs, as much
+        memory and as much storage, and is better in at least one of them. Rows that
+        tie exactly are all kept. Within a region, any mix that uses a dominated
+        instance can swap it for its dominator at no extra cost.
+        """
+        cost = self.numeric["hourly_cost"]
+        priced = np.flatnonzero((cost > 0) & (self.codes["provider"] >= 0) & (self.codes["region"] >= 0))
+        pairs = np.stack([self.codes["provider"][priced], self.codes["region"][priced]], axis=1)
+        keys, group_of = np.unique(pairs, axis=0, return_inverse=True)
+        skylines = {}
+        for group, (provider_code, region_code) in enumerate(keys):
+            rows = priced[group_of.ravel() == group]
+            mask = pareto_mask(cost[rows], [self.numeric[column][rows] for column in SKYLINE_COLUMNS], keep_ties=True)
+            key = (self.categories["provider"][provider_code], self.categories["region"][region_code])
+            skylines[key] = rows[mask]
+        return skylines
+
+    @cached_property
+    def skyline_mask(self) -> np.ndarray:
+        """Boolean mask of the rows on their (provider, region) skyline; the skyline_only filter."""
+        mask = np.zeros(self.size, dtype=bool)
+        for rows in self.skylines.values():
+            mask[rows] = True
+        return mask
+
+    @cached_property
+    def skyline_ids(self) -> List[int]:
+        """Ids of the skyline rows, ascending, for the same filter in SQL."""
+        return self.ids[self.skyline_mask].tolist()
+
+    def skyline(self, providers: Optional[List[str]] = None, regions: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """The skyline rows of each (provider, region), cheapest first, groups in provider and region order."""
+        groups = []
+        cost = self.numeric["hourly_cost"]
+        for (provider, region), rows in sorted(self.skylines.items()):
+            if (providers and provider not in providers) or (regions and region not in regions):
+                continue
+            rows = rows[np.lexsort((self.ids[rows], cost[rows]))]
+            groups.append({"provider": provider, "region": region, "instances": [self.rows[i] for i in rows]})
+        return groups
+
+    def skylines_on(self, columns: Tuple[str, ...]) -> Dict[Tuple[str, str], np.ndarray]:
+        """
+        The skylines when only some capacities matter (e.g. a workload that needs no
+        storage), leaving out rows with none of them and keeping one of each set of
+        exact ties. Derived from the full skylines, which hold every row that can be on
+        a narrower one, and kept per snapshot.
+        """
+        cached = self._narrow_skylines.get(columns)
+        if cached is None:
+            cost = self.numeric["hourly_cost"]
+            cached = {}
+            for key, rows in self.skylines.items():
+                capacities = [np.nan_to_num(self.numeric[column][rows]) for column in columns]
+                rows = rows[np.any([capacity > 0 for capacity in capacities], axis=0)]
+                cached[key] = rows[pareto_mask(cost[rows], [self.numeric[column][rows] for column in columns])]
+            self._narrow_skylines[columns] = cached
+        return cached
+
+    def iter_chunks(
+        self,
+        sort_by: str = "hourly_cost",
+        sort_order: str = "asc",
+        chunk_size: int = 1000,
+        **filters: Any,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Every matching row in (sort value, id) order, chunk_size rows at a time."""
+        if sort_by not in SORT_COLUMNS:
+            sort_by = "hourly_cost"
+        order = self._orders[sort_by] if sort_order == "asc" else self._orders[sort_by][::-1]
+        matching = order[self.filter_mask(**filters)[order]]
+        for start in range(0, len(matching), chunk_size):
+            yield [self.rows[i] for i in matching[start:start + chunk_size]]
+
+    def query(
+        self,
+        sort_by: str = "hourly_cost",
+        sort_order: str = "asc",
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[Cursor] = None,
+        total_mode: str = "exact",
+        **filters: Any,
+    ) -> Dict[str, Any]:
+        mask = self.filter_mask(**filters)
+        # Counting a mask is free, so "estimated" is answered exactly.
+        total = None if total_mode == "none" else int(np.count_nonzero(mask))
+
+        if sort_by not in SORT_COLUMNS:
+            sort_by = "hourly_cost"
+        ascending = scans_ascending(sort_order, cursor)
+        order = self._orders[sort_by] if ascending else self._orders[sort_by][::-1]
+        if cursor is not None:
+            mask &= self._keyset_mask(SORT_COLUMNS[sort_by], cursor, greater=ascending)
+            skip = 0
+
+        matching = order[mask[order]]
+        scanned = [self.rows[i] for i in matching[skip:skip + limit + 1]]
+        instances, next_cursor, prev_cursor = build_page(
+            scanned, limit, sort_by, sort_order, cursor, skip,
+            key=lambda row: (row[SORT_COLUMNS[sort_by]], row["id"]),
+        )
+
+        return {
+            "total": total,
+            "instances": instances,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        }
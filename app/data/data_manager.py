@@ -1,12 +1,93 @@
+import asyncio
+import json
+import logging
+import math
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.postgresql import insert
-from app.api.schemas import VMInstance as VMInstanceSchema
-from sqlalchemy import select, func, distinct
+from app.core.config import settings
+from app.database import ReadSessionLocal, hold_reads_on_primary
+from app.data.bulk_load import LIVE_TABLE, LOAD_COLUMNS, create_staging_table, index_staging_table, swap_staging_table, write_records
+from app.data import dimensions
+from app.data.column_store import SORT_COLUMNS, ColumnStore
+from app.data.fleet import recommend_fleet
+from app.data.result_cache import ResultCache
+from app.data.rows import InstanceRow, validate_batch
+from app.data.spool import BatchSpool
+from app.data.pagination import Cursor, build_page, decode_cursor, scans_ascending
+from cachetools import LRUCache
+from sqlalchemy import ARRAY, Integer, any_, bindparam, select, func, and_, or_, tuple_, text, delete, update
 from app import models
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 
-async def get_instances(
-    db: AsyncSession,
+logger = logging.getLogger(__name__)
+
+# Key of the transaction-level advisory lock that serializes provider refreshes.
+INGEST_LOCK_KEY = 0x766D7072  # "vmpr"
+# Channel on which a committed ingest is announced to the other worker processes;
+# the payload carries the provider and the announcing process, which ignores its own.
+INGEST_NOTIFY_CHANNEL = "vm_pricing_ingest"
+PROCESS_ID = uuid.uuid4().hex
+
+_column_store: Optional[ColumnStore] = None
+_column_store_lock = asyncio.Lock()
+
+# Plain columns selected for /instances pages, with the dimension names joined in
+# (select from INSTANCES_FROM); rows come back as tuples, not ORM entities.
+INSTANCE_COLUMNS = dimensions.INSTANCE_COLUMNS
+INSTANCES_FROM = dimensions.INSTANCES_FROM
+
+# Exact counts per filter signature, reused by total_mode="estimated" until the next ingest.
+_count_cache: LRUCache = LRUCache(maxsize=1024)
+# Fleet recommendations per (dataset version, normalized request).
+_fleet_cache: LRUCache = LRUCache(maxsize=256)
+# get_instances results per (filter signature, sort, page), until the next ingest.
+_result_cache = ResultCache(max_bytes=settings.RESULT_CACHE_MAX_BYTES)
+
+def invalidate_read_caches() -> None:
+    """Drops every cached count and result; called whenever the stored data changes."""
+    # Until replicas catch up, refill the caches from the primary.
+    hold_reads_on_primary()
+    _count_cache.clear()
+    _fleet_cache.clear()
+    _result_cache.invalidate()
+
+def get_result_cache_stats() -> dict:
+    return _result_cache.stats()
+
+async def load_column_store(db: AsyncSession) -> ColumnStore:
+    """
+    Builds a fresh in-memory snapshot of vm_instances and swaps it in atomically.
+    Readers holding the previous snapshot keep using it until they finish.
+    The snapshot backs the filter options and facets, and /instances when
+    READ_ENGINE is "memory"; it is rebuilt by every ingest rather than on a TTL.
+    """
+    global _column_store
+
+    result = await db.execute(select(*INSTANCE_COLUMNS).select_from(INSTANCES_FROM).order_by(models.VMInstance.id))
+    store = ColumnStore([dict(row._mapping) for row in result])
+    # Built here, once per ingest, rather than by the first analytics or skyline request.
+    store.price_rollups
+    store.skyline_ids
+    _column_store = store
+    return store
+
+def get_dataset_version() -> Optional[str]:
+    """Version of the loaded snapshot, or None before the first load. Never touches the database."""
+    return _column_store.version if _column_store is not None else None
+
+async def get_column_store(db: AsyncSession) -> ColumnStore:
+    if _column_store is None:
+        async with _column_store_lock:
+            if _column_store is None:
+                await load_column_store(db)
+    return _column_store
+
+def _filter_signature(
     providers: Optional[List[str]] = None,
     regions: Optional[List[str]] = None,
     instance_families: Optional[List[str]] = None,
@@ -16,96 +97,823 @@ async def get_instances(
     min_storage: Optional[int] = None,
     max_monthly_cost: Optional[float] = None,
     instance_name: Optional[str] = None,
-    sort_by: str = "hourly_cost",
-    sort_order: str = "asc",
-    skip: int = 0,
-    limit: int = 10
-):
-    base_query = select(models.VMInstance)
+    skyline_only: bool = False,
+) -> tuple:
+    """
+    Canonical, hashable form of a filter set: IN-lists sorted and de-duplicated,
+    numeric bounds normalized (falsy minimums dropped, as get_instances ignores them)
+    and the name search lower-cased. Equivalent filters map to the same signature.
+    """
+    def values(items):
+        return tuple(sorted(set(items))) if items else None
+
+    def bound(value):
+        return float(value) if value else None
+
+    return (
+        values(providers),
+        values(regions),
+        values(instance_families),
+        values(storage_types),
+        bound(min_vcpus),
+        bound(min_memory),
+        bound(min_storage),
+        float(max_monthly_cost) if max_monthly_cost is not None else None,
+        instance_name.lower() if instance_name else None,
+        True if skyline_only else None,
+    )
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
+def _apply_filters(
+    query,
+    providers: Optional[List[str]] = None,
+    regions: Optional[List[str]] = None,
+    instance_families: Optional[List[str]] = None,
+    storage_types: Optional[List[str]] = None,
+    min_vcpus: Optional[int] = None,
+    min_memory: Optional[float] = None,
+    min_storage: Optional[int] = None,
+    max_monthly_cost: Optional[float] = None,
+    instance_name: Optional[str] = None,
+    skyline_ids: Optional[List[int]] = None,
+):
+    # IN-lists compare dimension keys; the names are looked up in the small dimension tables.
     if providers:
-        base_query = base_query.where(models.VMInstance.provider.in_(providers))
+        query = query.where(dimensions.name_in("provider", providers))
     if regions:
-        base_query = base_query.where(models.VMInstance.region.in_(regions))
+        query = query.where(dimensions.name_in("region", regions))
     if instance_families:
-        base_query = base_query.where(models.VMInstance.instance_family.in_(instance_families))
+        query = query.where(dimensions.name_in("instance_family", instance_families))
     if storage_types:
-        base_query = base_query.where(models.VMInstance.storage_type.in_(storage_types))
+        query = query.where(dimensions.name_in("storage_type", storage_types))
     if min_vcpus:
-        base_query = base_query.where(models.VMInstance.vcpus >= min_vcpus)
+        query = query.where(models.VMInstance.vcpus >= min_vcpus)
     if min_memory:
-        base_query = base_query.where(models.VMInstance.memory_gb >= min_memory)
+        query = query.where(models.VMInstance.memory_gb >= min_memory)
     if min_storage:
-        base_query = base_query.where(models.VMInstance.storage_gb >= min_storage)
+        query = query.where(models.VMInstance.storage_gb >= min_storage)
     if max_monthly_cost is not None:
-        base_query = base_query.where(models.VMInstance.monthly_cost <= max_monthly_cost)
+        query = query.where(models.VMInstance.monthly_cost_normalized <= max_monthly_cost)
     if instance_name:
-        base_query = base_query.where(models.VMInstance.instance_name.ilike(f'%{instance_name}%'))
+        # Matched literally, as the memory engine does: % and _ in the search are not wildcards.
+        query = query.where(models.VMInstance.instance_name.ilike(f"%{_escape_like(instance_name)}%", escape="\\"))
+    if skyline_ids is not None:
+        # One array parameter, however many ids the skyline has.
+        query = query.where(models.VMInstance.id == any_(bindparam("skyline_ids", skyline_ids, type_=ARRAY(Integer))))
+    return query
+
+async def _database_filters(db: AsyncSession, filters: dict) -> dict:
+    """
+    get_instances filters as _apply_filters takes them. The skyline is only computed
+    in the snapshot, so skyline_only becomes the list of skyline ids.
+    """
+    filters = dict(filters)
+    if filters.pop("skyline_only", False):
+        store = await get_column_store(db)
+        filters["skyline_ids"] = store.skyline_ids
+    return filters
+
+def _sort_column(sort_by: str):
+    """Column /instances orders by for a sort_by; prices sort in the reference currency."""
+    return getattr(models.VMInstance, SORT_COLUMNS.get(sort_by, SORT_COLUMNS["hourly_cost"]))
+
+def _keyset_clause(sort_column, cursor: Cursor, greater: bool):
+    """
+    Rows strictly after (greater=True) or before the cursor in (sort value, id) order,
+    with NULL sort values ranked above every number.
+    """
+    id_column = models.VMInstance.id
+    if greater:
+        if cursor.value is None:
+            return and_(sort_column.is_(None), id_column > cursor.id)
+        return or_(tuple_(sort_column, id_column) > tuple_(cursor.value, cursor.id), sort_column.is_(None))
+    if cursor.value is None:
+        return or_(sort_column.isnot(None), id_column < cursor.id)
+    return tuple_(sort_column, id_column) < tuple_(cursor.value, cursor.id)
+
+async def _count_instances(db: AsyncSession, base_query, signature: tuple, total_mode: str) -> Optional[int]:
+    if total_mode == "none":
+        return None
+
+    if total_mode == "estimated":
+        if not any(part is not None for part in signature):
+            reltuples = await db.scalar(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'vm_instances'::regclass")
+            )
+            if reltuples is not None and reltuples > 0:
+                return int(reltuples)
+        cached = _count_cache.get(signature)
+        if cached is not None:
+            return cached
 
     count_query = select(func.count()).select_from(base_query.subquery())
     total = await db.scalar(count_query)
+    _count_cache[signature] = total
+    return total
+
+async def get_instances(
+    db: AsyncSession,
+    providers: Optional[List[str]] = None,
+    regions: Optional[List[str]] = None,
+    instance_families: Optional[List[str]] = None,
+    storage_types: Optional[List[str]] = None,
+    min_vcpus: Optional[int] = None,
+    min_memory: Optional[float] = None,
+    min_storage: Optional[int] = None,
+    max_monthly_cost: Optional[float] = None,
+    instance_name: Optional[str] = None,
+    skyline_only: bool = False,
+    sort_by: str = "hourly_cost",
+    sort_order: str = "asc",
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    total_mode: str = "exact"
+):
+    """
+    Filters, sorts and pages instances. Pages are addressed either by `skip` or by an
+    opaque `cursor` from a previous response (keyset pagination on (sort value, id));
+    when a cursor is given `skip` is ignored. `total_mode` selects an exact count,
+    an estimate (planner statistics or a per-filter count cached until the next
+    ingest) or no count at all. `skyline_only` keeps just the instances on their
+    (provider, region) skyline before any other filter applies.
+
+    Whole results (total and page) are kept in a memory-bounded LRU keyed by the
+    canonical filter signature plus sort and page, and dropped on ingest.
+    """
+    filters = dict(
+        providers=providers,
+        regions=regions,
+        instance_families=instance_families,
+        storage_types=storage_types,
+        min_vcpus=min_vcpus,
+        min_memory=min_memory,
+        min_storage=min_storage,
+        max_monthly_cost=max_monthly_cost,
+        instance_name=instance_name,
+        skyline_only=skyline_only,
+    )
+    decoded_cursor = decode_cursor(cursor, sort_by, sort_order) if cursor else None
 
-    sort_column = getattr(models.VMInstance, sort_by, models.VMInstance.hourly_cost)
-    if sort_order == "desc":
-        paginated_query = base_query.order_by(sort_column.desc())
+    if not _result_cache.enabled:
+        return await _query_instances(db, filters, sort_by, sort_order, skip, limit, decoded_cursor, total_mode)
+
+    cache_key = (
+        _filter_signature(**filters), sort_by, sort_order, 0 if cursor else skip, limit, cursor, total_mode,
+    )
+    cached = _result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    generation = _result_cache.generation
+    result = await _query_instances(db, filters, sort_by, sort_order, skip, limit, decoded_cursor, total_mode)
+    _result_cache.put(cache_key, result, generation)
+    return result
+
+async def _query_instances(
+    db: AsyncSession,
+    filters: dict,
+    sort_by: str,
+    sort_order: str,
+    skip: int,
+    limit: int,
+    decoded_cursor: Optional[Cursor],
+    total_mode: str,
+):
+    if settings.READ_ENGINE == "memory":
+        store = await get_column_store(db)
+        return store.query(
+            sort_by=sort_by,
+            sort_order=sort_order,
+            skip=skip,
+            limit=limit,
+            cursor=decoded_cursor,
+            total_mode=total_mode,
+            **filters,
+        )
+
+    base_query = _apply_filters(select(*INSTANCE_COLUMNS).select_from(INSTANCES_FROM), **await _database_filters(db, filters))
+    total = await _count_instances(db, base_query, _filter_signature(**filters), total_mode)
+
+    sort_column = _sort_column(sort_by)
+    if scans_ascending(sort_order, decoded_cursor):
+        paginated_query = base_query.order_by(sort_column.asc().nulls_last(), models.VMInstance.id.asc())
     else:
-        paginated_query = base_query.order_by(sort_column.asc())
-    
-    paginated_query = paginated_query.offset(skip).limit(limit)
+        paginated_query = base_query.order_by(sort_column.desc().nulls_first(), models.VMInstance.id.desc())
+
+    if decoded_cursor is not None:
+        greater = scans_ascending(sort_order, decoded_cursor)
+        paginated_query = paginated_query.where(_keyset_clause(sort_column, decoded_cursor, greater))
+        skip = 0
+
+    paginated_query = paginated_query.offset(skip).limit(limit + 1)
     
     result = await db.execute(paginated_query)
-    instances = result.scalars().all()
+    instances, next_cursor, prev_cursor = build_page(
+        [dict(row._mapping) for row in result], limit, sort_by, sort_order, decoded_cursor, skip,
+        key=lambda row: (row[sort_column.key], row["id"]),
+    )
     
-    return {"total": total, "instances": instances}
+    return {
+        "total": total,
+        "instances": instances,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+    }
+
+async def stream_instances(
+    filters: dict,
+    sort_by: str = "hourly_cost",
+    sort_order: str = "asc",
+    chunk_size: int = settings.EXPORT_BATCH_SIZE,
+) -> AsyncIterator[List[dict]]:
+    """
+    Every instance matching `filters` (the get_instances filter keywords), in sort order,
+    as lists of at most chunk_size row dicts. It opens its own read session, since the
+    rows are consumed while a response streams, after the request's session is gone.
+    The database path reads through a server-side cursor, so memory stays flat however
+    many rows match.
+    """
+    async with ReadSessionLocal() as db:
+        if settings.READ_ENGINE == "memory":
+            store = await get_column_store(db)
+            for chunk in store.iter_chunks(sort_by, sort_order, chunk_size, **filters):
+                yield chunk
+                # Let other requests run between chunks.
+                await asyncio.sleep(0)
+            return
+
+        sort_column = _sort_column(sort_by)
+        query = _apply_filters(select(*INSTANCE_COLUMNS).select_from(INSTANCES_FROM), **await _database_filters(db, filters))
+        if sort_order == "asc":
+            query = query.order_by(sort_column.asc().nulls_last(), models.VMInstance.id.asc())
+        else:
+            query = query.order_by(sort_column.desc().nulls_first(), models.VMInstance.id.desc())
+
+        result = await db.stream(query.execution_options(yield_per=chunk_size))
+        async for partition in result.mappings().partitions():
+            yield [dict(row) for row in partition]
 
 async def get_filter_options(db: AsyncSession):
     """
     Gets unique values for filter dropdowns on the frontend.
+    Served from the snapshot built at ingest, so page loads do not scan the table.
+    """
+    store = await get_column_store(db)
+    return store.filter_options()
+
+async def get_facets(db: AsyncSession, **filters):
+    """Per-value counts for provider, region, family and storage type under the given filters."""
+    store = await get_column_store(db)
+    return store.facets(**filters)
+
+async def get_providers(db: AsyncSession) -> List[str]:
+    store = await get_column_store(db)
+    return list(store.categories["provider"])
+
+async def get_regions(db: AsyncSession, provider: Optional[str] = None) -> List[str]:
+    store = await get_column_store(db)
+    return store.regions_for(provider)
+
+async def get_dataset_metrics(db: AsyncSession) -> dict:
+    """Row count and latest last_updated per provider, from the database."""
+    total_records = await db.scalar(select(func.count()).select_from(models.VMInstance))
+
+    provider = dimensions.instance_column("provider")
+    last_updated_results = await db.execute(
+        select(provider, func.max(models.VMInstance.last_updated).label("last_update"))
+        .select_from(INSTANCES_FROM)
+        .group_by(provider)
+    )
+    return {
+        "total_records": total_records,
+        "last_updated_times": {row.provider: row.last_update for row in last_updated_results},
+    }
+
+async def get_price_efficiency(db: AsyncSession, group_by: str, currency: Optional[str] = None) -> List[dict]:
+    """Min, median and p90 hourly price per vCPU and per GB for each value of `group_by`, from the snapshot's rollups."""
+    store = await get_column_store(db)
+    return store.price_rollups.efficiency_for(group_by, currency)
+
+async def get_cheapest_instances(
+    db: AsyncSession,
+    providers: Optional[List[str]] = None,
+    regions: Optional[List[str]] = None,
+    instance_families: Optional[List[str]] = None,
+) -> List[dict]:
+    """The cheapest instance of every (region, family), optionally narrowed down."""
+    store = await get_column_store(db)
+    return store.price_rollups.cheapest_for(providers, regions, instance_families)
+
+async def get_skyline(
+    db: AsyncSession,
+    providers: Optional[List[str]] = None,
+    regions: Optional[List[str]] = None,
+) -> List[dict]:
+    """Instances on the skyline of each (provider, region), from the snapshot."""
+    store = await get_column_store(db)
+    return store.skyline(providers, regions)
+
+async def get_fleet_recommendations(
+    db: AsyncSession,
+    vcpus: int = 0,
+    memory_gb: float = 0,
+    storage_gb: int = 0,
+    max_nodes: int = 20,
+    providers: Optional[List[str]] = None,
+    regions: Optional[List[str]] = None,
+    limit: int = 5,
+) -> List[dict]:
+    """Cheapest instance mixes covering the workload, one per (provider, region); see fleet.recommend_fleet."""
+    store = await get_column_store(db)
+    key = (
+        store.version, float(vcpus), float(memory_gb), float(storage_gb), max_nodes,
+        tuple(sorted(set(providers))) if providers else None,
+        tuple(sorted(set(regions))) if regions else None,
+        limit,
+    )
+    cached = _fleet_cache.get(key)
+    if cached is None:
+        # CPU-bound; keep the event loop free while a cold request searches.
+        cached = await asyncio.to_thread(
+            recommend_fleet, store, (vcpus, memory_gb, storage_gb), max_nodes, providers, regions, limit
+        )
+        _fleet_cache[key] = cached
+    return cached
+
+async def autocomplete_instance_names(
+    db: AsyncSession,
+    query: str,
+    limit: int = 10,
+    providers: Optional[List[str]] = None,
+) -> List[dict]:
     """
+    Top (instance_name, provider) pairs whose name contains `query`, case-insensitively:
+    prefix matches first, then earlier matches, shorter names and alphabetical order.
+    The database path is served by the pg_trgm index; with READ_ENGINE "memory" the
+    snapshot's trigram index answers instead.
+    """
+    if settings.READ_ENGINE == "memory":
+        store = await get_column_store(db)
+        return store.autocomplete(query, limit, providers)
+
+    name = models.VMInstance.instance_name
+    provider = dimensions.instance_column("provider")
+    needle = query.lower()
+    statement = (
+        select(name, provider)
+        .select_from(INSTANCES_FROM)
+        .where(name.ilike(f"%{_escape_like(query)}%", escape="\\"))
+        .group_by(name, provider)
+        .order_by(
+            func.strpos(func.lower(name), needle),
+            func.length(name),
+            func.lower(name),
+            provider,
+        )
+        .limit(limit)
+    )
+    if providers:
+        statement = statement.where(dimensions.name_in("provider", providers))
 
-    providers_query = select(distinct(models.VMInstance.provider)).order_by(models.VMInstance.provider)
-    providers_res = await db.execute(providers_query)
-    providers = [p for p in providers_res.scalars().all() if p]
+    result = await db.execute(statement)
+    return [{"instance_name": row.instance_name, "provider": row.provider} for row in result]
 
-    regions_query = select(distinct(models.VMInstance.region)).order_by(models.VMInstance.region)
-    regions_res = await db.execute(regions_query)
-    regions = [r for r in regions_res.scalars().all() if r]
+# Columns compared by the diff ingest; last_updated is excluded, so an unchanged row is not
+# rewritten, only its last_updated bumped once per refresh.
+DIFF_COLUMNS = (
+    "vcpus", "memory_gb", "storage_gb", "storage_type", "hourly_cost", "monthly_cost",
+    "spot_price", "currency", "hourly_cost_normalized", "monthly_cost_normalized",
+    "instance_family", "network_performance",
+)
+PRICE_COLUMNS = ("hourly_cost", "monthly_cost", "currency")
+# Costs also stored in the reference currency, as <column>_normalized.
+NORMALIZED_COLUMNS = ("hourly_cost", "monthly_cost")
 
-    families_query = select(distinct(models.VMInstance.instance_family)).order_by(models.VMInstance.instance_family)
-    families_res = await db.execute(families_query)
-    instance_families = [f for f in families_res.scalars().all() if f]
+def _same_value(current, new) -> bool:
+    if _is_missing(current) and _is_missing(new):
+        return True
+    return current == new
 
-    storage_types_query = select(distinct(models.VMInstance.storage_type)).order_by(models.VMInstance.storage_type)
-    storage_types_res = await db.execute(storage_types_query)
-    storage_types = [s for s in storage_types_res.scalars().all() if s]
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
 
+def _price_point(record: dict, recorded_at: datetime) -> dict:
     return {
-        "providers": providers,
-        "regions": regions,
-        "instance_families": instance_families,
-        "storage_types": storage_types
+        "provider": record["provider"],
+        "instance_name": record["instance_name"],
+        "region": record["region"],
+        "hourly_cost": record["hourly_cost"],
+        "monthly_cost": record["monthly_cost"],
+        "currency": record["currency"],
+        "recorded_at": recorded_at,
     }
 
-async def update_provider_data(db: AsyncSession, provider: str, instances_data: List[VMInstanceSchema]):
+@dataclass
+class _ProviderDiff:
+    inserts: List[dict] = field(default_factory=list)
+    updates: List[dict] = field(default_factory=list)
+    history: List[dict] = field(default_factory=list)
+    unchanged: int = 0
+
+class _ProviderDiffState:
+    """
+    Incremental diff of a provider's stored rows against fresh records arriving in
+    batches, keyed on (provider, instance_name, region). Each batch is diffed as it
+    arrives; whatever stored rows are never matched are stale once the stream ends.
+    Appearing rows and price changes become price_history points.
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.current_rows = {}
+        self.stale_ids: List[int] = []
+        self.unchanged_ids: List[int] = []
+        self.seen = set()
+        self.recorded_at = datetime.utcnow()
+        self.inserted = self.updated = self.unchanged = self.price_changes = 0
+
+    async def load(self, db: AsyncSession) -> None:
+        columns = [models.VMInstance.id, models.VMInstance.instance_name, dimensions.instance_column("region")]
+        columns += [dimensions.instance_column(name) for name in DIFF_COLUMNS]
+        result = await db.execute(
+            select(*columns).select_from(INSTANCES_FROM).where(dimensions.name_is("provider", self.provider))
+        )
+
+        for row in result:
+            key = (row.instance_name, row.region)
+            if key in self.current_rows:
+                # Duplicate stored keys can only come from older ingests; keep one.
+                self.stale_ids.append(row.id)
+            else:
+                self.current_rows[key] = row
+
+    def diff_batch(self, records: List[dict]) -> _ProviderDiff:
+        diff = _ProviderDiff()
+
+        for record in records:
+            key = (record["instance_name"], record["region"])
+            if key in self.seen:
+                continue
+            self.seen.add(key)
+
+            current = self.current_rows.pop(key, None)
+            if current is None:
+                diff.inserts.append(record)
+                diff.history.append(_price_point(record, self.recorded_at))
+                continue
+
+            if all(_same_value(getattr(current, name), record[name]) for name in DIFF_COLUMNS):
+                diff.unchanged += 1
+                self.unchanged_ids.append(current.id)
+                continue
+
+            diff.updates.append({"id": current.id, **record})
+            if not all(_same_value(getattr(current, name), record[name]) for name in PRICE_COLUMNS):
+                diff.history.append(_price_point(record, self.recorded_at))
+
+        self.inserted += len(diff.inserts)
+        self.updated += len(diff.updates)
+        self.unchanged += diff.unchanged
+        self.price_changes += len(diff.history)
+        return diff
+
+    def remaining_ids(self) -> List[int]:
+        return self.stale_ids + [row.id for row in self.current_rows.values()]
+
+class _ProviderWriter(ABC):
+    """Writes one provider refresh, batch by batch, in the caller's transaction."""
+
+    def __init__(self, db: AsyncSession, provider: str):
+        self.db = db
+        self.provider = provider
+        self.keys = dimensions.DimensionKeys()
+
+    async def begin(self) -> None:
+        pass
+
+    @abstractmethod
+    async def write(self, records: List[dict]) -> int:
+        """Writes a batch; returns how many of its rows the provider now has stored."""
+        pass
+
+    async def finish(self) -> None:
+        pass
+
+class _ReplaceWriter(_ProviderWriter):
+    async def begin(self) -> None:
+        delete_statement = models.VMInstance.__table__.delete().where(dimensions.name_is("provider", self.provider))
+        await self.db.execute(delete_statement)
+
+    async def write(self, records: List[dict]) -> int:
+        await self.db.execute(insert(models.VMInstance), await self.keys.encode(self.db, records))
+        return len(records)
+
+class _DiffWriter(_ProviderWriter):
+    """Writes only the inserted, changed and removed rows of a provider."""
+
+    async def begin(self) -> None:
+        self.state = _ProviderDiffState(self.provider)
+        await self.state.load(self.db)
+
+    async def write(self, records: List[dict]) -> int:
+        diff = self.state.diff_batch(records)
+        if diff.updates:
+            await self.db.execute(update(models.VMInstance), await self.keys.encode(self.db, diff.updates))
+        if diff.inserts:
+            await self.db.execute(insert(models.VMInstance), await self.keys.encode(self.db, diff.inserts))
+        if diff.history:
+            await self.db.execute(insert(models.PriceHistory), diff.history)
+        # Keys repeated within the refresh are skipped by the diff and not counted.
+        return len(diff.inserts) + len(diff.updates) + diff.unchanged
+
+    async def finish(self) -> None:
+        stale_ids = self.state.remaining_ids()
+        if stale_ids:
+            await self.db.execute(delete(models.VMInstance).where(models.VMInstance.id.in_(stale_ids)))
+
+        state = self.state
+        if state.unchanged_ids:
+            # last_updated records the latest refresh that saw a row, changed or not.
+            await self.db.execute(
+                update(models.VMInstance)
+                .where(models.VMInstance.id == any_(bindparam("unchanged_ids", state.unchanged_ids, type_=ARRAY(Integer))))
+                .values(last_updated=state.recorded_at)
+            )
+        logger.info(
+            "%s diff: %d inserted, %d updated, %d deleted, %d unchanged, %d price changes recorded.",
+            self.provider, state.inserted, state.updated, len(stale_ids), state.unchanged, state.price_changes,
+        )
+
+class _SwapWriter(_ProviderWriter):
+    """
+    Builds the post-refresh table off to the side and swaps it in.
+
+    vm_instances_staging is filled with the other providers' rows (ids preserved) and
+    the fresh rows via COPY, then indexed and ANALYZEd, and finally renamed over the
+    live table. Everything runs in the caller's transaction, but the live table is
+    only read until the final renames, so readers are blocked for the catalog swap
+    and commit alone and never see a partially loaded provider.
+    """
+
+    async def begin(self) -> None:
+        self.timings = {}
+        self.started = time.perf_counter()
+        self.history: List[dict] = []
+        self.rows = 0
+
+        self.state = _ProviderDiffState(self.provider)
+        await self.state.load(self.db)
+        self._phase("diff_load")
+
+        self.conn = await self.db.connection()
+        self.staging = await create_staging_table(self.conn)
+        provider_id = (await self.keys.resolve(self.conn, "provider", [self.provider]))[self.provider]
+        await self.conn.execute(
+            text(
+                f"INSERT INTO {self.staging.name} SELECT * FROM {LIVE_TABLE.name} "
+                "WHERE provider_id IS DISTINCT FROM :provider_id"
+            ),
+            {"provider_id": provider_id},
+        )
+        self._phase("copy_other_providers")
+
+    def _phase(self, name: str) -> None:
+        now = time.perf_counter()
+        self.timings[name] = self.timings.get(name, 0.0) + now - self.started
+        self.started = now
+
+    async def write(self, records: List[dict]) -> int:
+        self.history.extend(self.state.diff_batch(records).history)
+        self._phase("diff")
+        encoded = await self.keys.encode(self.conn, records)
+        rows = await write_records(
+            self.conn, self.staging, [tuple(record.get(column.name) for column in LOAD_COLUMNS) for record in encoded]
+        )
+        self.rows += rows
+        self._phase("load")
+        return rows
+
+    async def finish(self) -> None:
+        await index_staging_table(self.conn)
+        self._phase("index_analyze")
+
+        if self.history:
+            await self.db.execute(insert(models.PriceHistory), self.history)
+        await swap_staging_table(self.conn)
+        self._phase("swap")
+
+        logger.info(
+            "%s swap refresh: %d rows; %s.",
+            self.provider, self.rows,
+            ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.timings.items()),
+        )
+
+_WRITERS = {"replace": _ReplaceWriter, "diff": _DiffWriter, "swap": _SwapWriter}
+
+async def load_fx_rates(db: AsyncSession) -> Dict[str, float]:
+    """Stored rates by currency; the reference currency is always 1."""
+    result = await db.execute(select(models.FxRate.currency, models.FxRate.rate))
+    rates = {currency: rate for currency, rate in result}
+    rates[settings.REFERENCE_CURRENCY] = 1.0
+    return rates
+
+def normalize_costs(record: dict, rates: Dict[str, float]) -> dict:
+    """Adds the reference-currency costs to an ingest record; None without a rate for its currency."""
+    rate = rates.get(record["currency"])
+    for column in NORMALIZED_COLUMNS:
+        value = record[column]
+        record[f"{column}_normalized"] = None if rate is None or value is None else value * rate
+    return record
+
+async def update_fx_rates(db: AsyncSession, rates: Dict[str, float]) -> int:
+    """
+    Stores the value of one unit of each currency in the reference currency and
+    re-derives the normalized costs that change with it, in one transaction under the
+    ingest lock. Currencies missing from `rates` keep their stored rate. Returns the
+    number of instances whose normalized costs changed; if any did, the change is
+    announced and the snapshot reloaded, as after an ingest.
+    """
+    await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": INGEST_LOCK_KEY})
+
+    updated_at = datetime.utcnow()
+    rates = {**rates, settings.REFERENCE_CURRENCY: 1.0}
+    statement = insert(models.FxRate).values(
+        [{"currency": currency, "rate": rate, "updated_at": updated_at} for currency, rate in rates.items()]
+    )
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[models.FxRate.currency],
+        set_={"rate": statement.excluded.rate, "updated_at": statement.excluded.updated_at},
+    ))
+
+    # One set-based UPDATE that only touches rows whose normalized costs actually move.
+    rate = models.FxRate.__table__.c.rate
+    converted = {f"{column}_normalized": LIVE_TABLE.c[column] * rate for column in NORMALIZED_COLUMNS}
+    result = await db.execute(
+        update(LIVE_TABLE)
+        .where(
+            LIVE_TABLE.c.currency == models.FxRate.__table__.c.currency,
+            or_(*[LIVE_TABLE.c[name].is_distinct_from(value) for name, value in converted.items()]),
+        )
+        .values(**converted)
+    )
+    if not result.rowcount:
+        await db.commit()
+        return 0
+
+    await _commit_data_change(db, "fx_rates")
+    logger.info("FX rates updated; normalized costs of %d instances changed.", result.rowcount)
+    return result.rowcount
+
+async def get_fx_rates(db: AsyncSession) -> List[dict]:
+    result = await db.execute(
+        select(models.FxRate.currency, models.FxRate.rate, models.FxRate.updated_at).order_by(models.FxRate.currency)
+    )
+    return [dict(row._mapping) for row in result]
+
+async def spool_batches(batches: AsyncIterator[List[InstanceRow]]) -> BatchSpool:
+    """
+    Validates a provider's batches as they arrive and buffers them on disk. The
+    caller closes the spool, which removes the file.
+    """
+    spool = BatchSpool(settings.INGEST_SPOOL_DIR)
+    try:
+        async for batch in batches:
+            valid = validate_batch(batch)
+            if valid:
+                await spool.append(valid)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+async def write_provider_spool(db: AsyncSession, provider: str, spool: BatchSpool) -> int:
+    """
+    Writes a spooled provider refresh. The write strategy follows INGEST_MODE:
+    "diff" writes only changed rows, "replace" rewrites them all and "swap" rebuilds
+    the table in a shadow copy that is swapped in atomically. The refresh is one
+    transaction; if no rows were spooled the stored data is kept. Returns the number
+    of rows the provider has stored afterwards.
+    """
+    if not spool.rows:
+        return 0
+
+    # Provider refreshes are serialized: a swap copies the other providers' rows and
+    # must not race a concurrent write to them. The lock and the transaction are only
+    # taken now, with the whole refresh already fetched and spooled.
+    await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": INGEST_LOCK_KEY})
+
+    rates = await load_fx_rates(db)
+    writer = _WRITERS.get(settings.INGEST_MODE, _DiffWriter)(db, provider)
+    await writer.begin()
+
+    total = 0
+    async for batch in spool.read():
+        total += await writer.write([normalize_costs(row.as_dict(), rates) for row in batch])
+
+    if total == 0:
+        await db.rollback()
+        return 0
+
+    await writer.finish()
+    await _commit_data_change(db, provider)
+    return total
+
+async def ingest_provider_batches(
+    db: AsyncSession,
+    provider: str,
+    batches: AsyncIterator[List[InstanceRow]],
+) -> int:
+    """
+    Streams a provider refresh into the database. The batches are spooled to disk
+    first, so the full result set is never held in memory and no lock or transaction
+    is held while the provider is still fetching; see write_provider_spool.
+    """
+    with await spool_batches(batches) as spool:
+        return await write_provider_spool(db, provider, spool)
+
+async def announce_data_change(db, source: str) -> None:
+    """
+    Tells every worker to reload its snapshot and drop its caches once the current
+    transaction commits; it is not delivered if the transaction rolls back.
+    """
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": INGEST_NOTIFY_CHANNEL, "payload": json.dumps({"provider": source, "origin": PROCESS_ID})},
+    )
+
+async def _commit_data_change(db: AsyncSession, source: str) -> None:
+    """Commits a change to vm_instances, announces it to the other workers and reloads this one's snapshot."""
+    await announce_data_change(db, source)
+    await db.commit()
+    await load_column_store(db)
+    # After the snapshot swap, so no result read from the old snapshot can be cached.
+    invalidate_read_caches()
+
+async def update_provider_data(db: AsyncSession, provider: str, instances_data: List[InstanceRow]):
     """
     Updates the database with a fresh list of instances for a specific provider.
-    This function performs an "upsert" (insert or update).
+    See ingest_provider_batches for the write strategies.
     """
     if not instances_data:
         return 0
 
-    delete_statement = models.VMInstance.__table__.delete().where(
-        models.VMInstance.provider == provider
+    async def single_batch():
+        yield instances_data
+
+    return await ingest_provider_batches(db, provider, single_batch())
+
+def _downsample(points: List[dict], max_points: int) -> List[dict]:
+    """Keeps the last point of each of max_points equal-width time buckets."""
+    if max_points <= 0 or len(points) <= max_points:
+        return points
+
+    start = points[0]["recorded_at"].timestamp()
+    span = points[-1]["recorded_at"].timestamp() - start
+    if span <= 0:
+        return points[-1:]
+
+    buckets = {}
+    for point in points:
+        bucket = min(int((point["recorded_at"].timestamp() - start) / span * max_points), max_points - 1)
+        buckets[bucket] = point
+    return [buckets[bucket] for bucket in sorted(buckets)]
+
+async def get_price_history(
+    db: AsyncSession,
+    provider: str,
+    instance_name: str,
+    region: str,
+    since: Optional[datetime] = None,
+    max_points: Optional[int] = None,
+) -> dict:
+    query = (
+        select(
+            models.PriceHistory.recorded_at,
+            models.PriceHistory.hourly_cost,
+            models.PriceHistory.monthly_cost,
+            models.PriceHistory.currency,
+        )
+        .where(
+            models.PriceHistory.provider == provider,
+            models.PriceHistory.instance_name == instance_name,
+            models.PriceHistory.region == region,
+        )
+        .order_by(models.PriceHistory.recorded_at)
     )
-    await db.execute(delete_statement)
+    if since is not None:
+        query = query.where(models.PriceHistory.recorded_at >= since)
 
-    new_instances = [
-        instance.model_dump() for instance in instances_data
-    ]
-    
-    insert_statement = insert(models.VMInstance).values(new_instances)
-    
-    result = await db.execute(insert_statement)
-    await db.commit()
-    
-    return len(new_instances)
\ No newline at end of file
+    result = await db.execute(query)
+    points = [dict(row._mapping) for row in result]
+    if max_points:
+        points = _downsample(points, max_points)
+
+    return {
+        "provider": provider,
+        "instance_name": instance_name,
+        "region": region,
+        "points": points,
+    }
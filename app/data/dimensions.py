@@ -0,0 +1,131 @@
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from sqlalchemy import Column, inspect, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.schema import AddConstraint
+
+from app import models
+
+# Dictionary-encoded columns of vm_instances: the name rows and the API use, and the
+# dimension table behind the <name>_id key actually stored.
+DIMENSIONS = {
+    "provider": models.Provider,
+    "region": models.Region,
+    "instance_family": models.InstanceFamily,
+    "storage_type": models.StorageType,
+}
+
+_INSTANCES = models.VMInstance.__table__
+
+
+def key_column(name: str) -> Column:
+    return _INSTANCES.c[f"{name}_id"]
+
+
+def instance_column(name: str):
+    """The vm_instances column `name` as rows expose it: a dimension's name, labelled, or the column itself."""
+    if name in DIMENSIONS:
+        return DIMENSIONS[name].__table__.c.name.label(name)
+    return _INSTANCES.c[name]
+
+
+def _exposed_name(column: Column) -> str:
+    name = column.name
+    return name[:-3] if name.endswith("_id") and name[:-3] in DIMENSIONS else name
+
+
+# vm_instances as the API sees it: every column, in table order, with names for keys.
+INSTANCE_COLUMNS = [instance_column(_exposed_name(column)) for column in _INSTANCES.columns]
+
+# vm_instances with each dimension joined in; select INSTANCE_COLUMNS from this.
+INSTANCES_FROM = _INSTANCES
+for _name, _dimension in DIMENSIONS.items():
+    INSTANCES_FROM = INSTANCES_FROM.outerjoin(_dimension.__table__, key_column(_name) == _dimension.__table__.c.id)
+
+
+def name_in(name: str, values: Iterable[str]):
+    """Rows whose dimension column `name` is one of values, compared as integer keys."""
+    table = DIMENSIONS[name].__table__
+    return key_column(name).in_(select(table.c.id).where(table.c.name.in_(list(values))))
+
+
+def name_is(name: str, value: str):
+    table = DIMENSIONS[name].__table__
+    return key_column(name) == select(table.c.id).where(table.c.name == value).scalar_subquery()
+
+
+class DimensionKeys:
+    """
+    Name-to-key maps of the dimension tables, for writing rows. Names seen for the
+    first time are added to their dimension table in the caller's transaction, so an
+    instance must not outlive a transaction that is rolled back.
+    """
+
+    def __init__(self):
+        self.keys: Dict[str, Dict[str, int]] = {name: {} for name in DIMENSIONS}
+
+    async def resolve(self, db: Union[AsyncSession, AsyncConnection], name: str, values: Iterable[Optional[str]]) -> Dict[str, int]:
+        keys = self.keys[name]
+        missing = {value for value in values if value is not None and value not in keys}
+        if not missing:
+            return keys
+
+        # Look the names up before inserting: an INSERT draws from the id sequence even
+        # when ON CONFLICT skips the row, and the SMALLSERIAL ids would soon run out.
+        table = DIMENSIONS[name].__table__
+        result = await db.execute(select(table.c.name, table.c.id).where(table.c.name.in_(missing)))
+        keys.update((value, key) for value, key in result)
+        new = sorted(missing.difference(keys))
+        if new:
+            await db.execute(
+                insert(table).values([{"name": value} for value in new]).on_conflict_do_nothing(
+                    index_elements=[table.c.name]
+                )
+            )
+            result = await db.execute(select(table.c.name, table.c.id).where(table.c.name.in_(new)))
+            keys.update((value, key) for value, key in result)
+        return keys
+
+    async def encode(self, db: Union[AsyncSession, AsyncConnection], records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Copies of the records with each dimension name replaced by its <name>_id key."""
+        keys = {name: await self.resolve(db, name, (record[name] for record in records)) for name in DIMENSIONS}
+        encoded = []
+        for record in records:
+            record = dict(record)
+            for name, lookup in keys.items():
+                value = record.pop(name)
+                record[f"{name}_id"] = None if value is None else lookup[value]
+            encoded.append(record)
+        return encoded
+
+
+async def encode_string_columns(conn: AsyncConnection) -> None:
+    """
+    Moves a vm_instances table of earlier versions, which stored the dimension names
+    in every row, to dimension keys: fills the dimension tables and key columns, drops
+    the string columns (and their indexes) and adds the foreign keys. Runs after the
+    key columns were added and before the indexes are created; a no-op once done.
+    """
+    existing = await conn.run_sync(
+        lambda sync_conn: {column["name"] for column in inspect(sync_conn).get_columns(_INSTANCES.name)}
+    )
+    legacy = [name for name in DIMENSIONS if name in existing]
+    if not legacy:
+        return
+
+    for name in legacy:
+        dimension = DIMENSIONS[name].__table__.name
+        await conn.execute(text(
+            f"INSERT INTO {dimension} (name) SELECT DISTINCT {name} FROM {_INSTANCES.name} "
+            f"WHERE {name} IS NOT NULL ON CONFLICT (name) DO NOTHING"
+        ))
+        await conn.execute(text(
+            f"UPDATE {_INSTANCES.name} SET {name}_id = {dimension}.id FROM {dimension} "
+            f"WHERE {dimension}.name = {_INSTANCES.name}.{name}"
+        ))
+        await conn.execute(text(f"ALTER TABLE {_INSTANCES.name} DROP COLUMN {name}"))
+
+    for constraint in _INSTANCES.foreign_key_constraints:
+        await conn.execute(AddConstraint(constraint))
+    await conn.execute(text(f"ANALYZE {_INSTANCES.name}"))
@@ -0,0 +1,265 @@
+import itertools
+import math
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Capacity columns a workload can ask for, in the order requirements are given.
+CAPACITY_COLUMNS = ("vcpus", "memory_gb", "storage_gb")
+# Price minimized and ranked on, in the reference currency so regions billed in different currencies compare.
+COST_COLUMN = "hourly_cost_normalized"
+# Search nodes one (provider, region) may expand before its best mix so far is returned.
+DEFAULT_NODE_BUDGET = 20000
+# Branches that cannot beat the best mix so far by more than this fraction are not explored,
+# so a returned mix is within this much of the cheapest possible.
+DEFAULT_OPTIMALITY_GAP = 0.01
+# Grid resolution of the price directions behind the lower bound, by number of requirements.
+_DIRECTION_STEPS = {1: 1, 2: 48, 3: 12}
+
+_EPSILON = 1e-9
+
+
+@lru_cache(maxsize=None)
+def _price_directions(dimensions: int) -> np.ndarray:
+    """Non-negative weight vectors summing to one, on a grid over the simplex (dimensions x directions)."""
+    steps = _DIRECTION_STEPS[dimensions]
+    grid = [weights for weights in itertools.product(range(steps + 1), repeat=dimensions) if sum(weights) == steps]
+    return np.array(grid, dtype=np.float64).T / steps
+
+
+@dataclass
+class _Search:
+    cost: np.ndarray
+    capacity: np.ndarray          # shapes x requirements
+    directions: np.ndarray        # requirements x directions
+    node_prices: np.ndarray       # multipliers of the node limit
+    unit_price: np.ndarray        # suffix minimum of (cost + node price) / (capacity . direction),
+                                  # shapes + 1 x directions x node prices
+    max_capacity: np.ndarray      # suffix maximum capacity, shapes + 1 x requirements
+    best_cost: float
+    budget: int
+    gap: float
+    best_counts: Optional[List[int]] = None
+    expanded: int = 0
+    exhausted: bool = False
+    counts: List[int] = field(default_factory=list)
+
+
+def _lower_bound(search: _Search, k: int, remaining: np.ndarray, nodes_left: int) -> float:
+    """
+    Lagrangian (LP dual) bound on covering `remaining` with at most nodes_left of the
+    shapes k onwards. For any price vector y >= 0 and node price m >= 0, a mix costs at
+    least (remaining . y) times the lowest (cost + m) per unit of y among those shapes,
+    minus m times nodes_left. The best of a grid of (y, m) comes close to the LP
+    relaxation, node limit included.
+    """
+    value = np.maximum(remaining, 0.0) @ search.directions
+    wanted = value > _EPSILON
+    if not wanted.any():
+        return 0.0
+    bounds = value[wanted, None] * search.unit_price[k][wanted] - search.node_prices * nodes_left
+    return float(max(np.max(bounds), 0.0))
+
+
+def _branch(search: _Search, k: int, remaining: np.ndarray, nodes_left: int, cost_so_far: float) -> None:
+    if not (remaining > _EPSILON).any():
+        if cost_so_far < search.best_cost - _EPSILON:
+            search.best_cost = cost_so_far
+            search.best_counts = list(search.counts)
+        return
+    if k == len(search.cost) or nodes_left == 0:
+        return
+    search.expanded += 1
+    if search.expanded > search.budget:
+        search.exhausted = True
+        return
+    if cost_so_far + _lower_bound(search, k, remaining, nodes_left) >= search.best_cost * (1 - search.gap) - _EPSILON:
+        return
+    # Not enough nodes left even if every one were the largest remaining shape.
+    needed = remaining > _EPSILON
+    largest = search.max_capacity[k][needed]
+    if (largest <= 0).any() or np.max(np.ceil(remaining[needed] / largest - _EPSILON)) > nodes_left:
+        return
+
+    capacity = search.capacity[k]
+    useful = needed & (capacity > 0)
+    most = 0
+    if useful.any():
+        most = int(min(nodes_left, np.max(np.ceil(remaining[useful] / capacity[useful] - _EPSILON))))
+    for count in range(most, -1, -1):
+        search.counts[k] = count
+        _branch(search, k + 1, remaining - count * capacity, nodes_left - count, cost_so_far + count * search.cost[k])
+        if search.exhausted:
+            break
+    search.counts[k] = 0
+
+
+def _greedy(cost: np.ndarray, capacity: np.ndarray, need: np.ndarray, max_nodes: int) -> Optional[Tuple[float, List[int]]]:
+    """Adds whichever shape covers the most of what is still missing per unit of cost, one at a time."""
+    remaining = need.astype(np.float64)
+    counts = [0] * len(cost)
+    total = 0.0
+    for _ in range(max_nodes):
+        if not (remaining > _EPSILON).any():
+            break
+        covered = (np.minimum(capacity, np.maximum(remaining, 0.0)) / need).sum(axis=1)
+        with np.errstate(divide="ignore"):
+            best = int(np.argmin(np.where(covered > _EPSILON, cost / covered, np.inf)))
+        if covered[best] <= _EPSILON:
+            return None
+        counts[best] += 1
+        remaining -= capacity[best]
+        total += cost[best]
+    if (remaining > _EPSILON).any():
+        return None
+    return total, counts
+
+
+def solve_fleet(
+    cost: np.ndarray,
+    capacity: np.ndarray,
+    need: np.ndarray,
+    max_nodes: int,
+    cutoff: float = math.inf,
+    budget: int = DEFAULT_NODE_BUDGET,
+    gap: float = DEFAULT_OPTIMALITY_GAP,
+) -> Optional[Tuple[float, List[int], bool]]:
+    """
+    Cheapest non-negative integer counts of the given shapes (rows of `capacity`)
+    covering `need` (all positive) with at most max_nodes instances, by depth-first
+    branch and bound from a greedy starting mix. Only mixes cheaper than `cutoff` are
+    looked for. Returns (cost, counts, optimal) or None when there is no such mix.
+    `optimal` means the mix is proven to be within `gap` of the cheapest; it is False
+    when the node budget ran out first and the mix is merely the best found.
+    """
+    if not len(cost):
+        return None
+    directions = _price_directions(len(need))
+    # No node price, then a spread of the shapes' own prices.
+    node_prices = np.concatenate([[0.0], np.quantile(cost, (0.1, 0.25, 0.5, 0.75, 1.0))])
+    covered = capacity @ directions
+    with np.errstate(divide="ignore"):
+        unit_price = np.where(
+            covered[:, :, None] > 0, (cost[:, None, None] + node_prices) / covered[:, :, None], np.inf
+        )
+    # Shapes that are cheap in the most telling direction first, so good mixes turn up early.
+    root = int(np.argmax((need @ directions) * unit_price[:, :, 0].min(axis=0)))
+    order = np.argsort(unit_price[:, root, 0], kind="stable")
+    cost, capacity, unit_price = cost[order], capacity[order], unit_price[order]
+
+    suffix_price = np.concatenate([
+        np.minimum.accumulate(unit_price[::-1], axis=0)[::-1],
+        np.full((1,) + unit_price.shape[1:], np.inf),
+    ])
+    suffix_capacity = np.vstack([np.maximum.accumulate(capacity[::-1], axis=0)[::-1], np.zeros(len(need))])
+    search = _Search(
+        cost, capacity, directions, node_prices, suffix_price, suffix_capacity,
+        best_cost=cutoff, budget=budget, gap=gap,
+    )
+    search.counts = [0] * len(cost)
+
+    greedy = _greedy(cost, capacity, need, max_nodes)
+    if greedy is not None and greedy[0] < cutoff:
+        search.best_cost, search.best_counts = greedy
+
+    _branch(search, 0, need.astype(np.float64), max_nodes, 0.0)
+    if search.best_counts is None:
+        return None
+    counts = [0] * len(cost)
+    for position, count in zip(order, search.best_counts):
+        counts[position] = count
+    return search.best_cost, counts, not search.exhausted
+
+
+def _root_bound(store, rows: np.ndarray, need: np.ndarray) -> float:
+    """Lower bound on any mix of these rows covering need; infinite when there are none."""
+    required = need > 0
+    if not len(rows):
+        return math.inf
+    capacity = np.column_stack([np.nan_to_num(store.numeric[column][rows]) for column in CAPACITY_COLUMNS])[:, required]
+    directions = _price_directions(int(required.sum()))
+    with np.errstate(divide="ignore"):
+        unit_price = np.where(capacity @ directions > 0, store.numeric[COST_COLUMN][rows][:, None] / (capacity @ directions), np.inf)
+    return float(np.max((need[required] @ directions) * unit_price.min(axis=0)))
+
+
+def recommend_fleet(
+    store,
+    need: Sequence[float],
+    max_nodes: int,
+    providers: Optional[List[str]] = None,
+    regions: Optional[List[str]] = None,
+    limit: int = 5,
+) -> List[Dict[str, Any]]:
+    """
+    The cheapest instance mix within each (provider, region), best `limit` first, with
+    prices compared in the reference currency. Each group is searched over its skyline on just the capacities the workload asks
+    for, and with the limit-th best mix found so far as a cutoff,
+    so most groups are dismissed by their lower bound alone.
+    """
+    need = np.asarray(need, dtype=np.float64)
+    required = need > 0
+    columns = tuple(column for column, wanted in zip(CAPACITY_COLUMNS, required) if wanted)
+    priced = np.isfinite(store.numeric[COST_COLUMN])
+    groups = []
+    for key, rows in store.skylines_on(columns).items():
+        if (providers and key[0] not in providers) or (regions and key[1] not in regions):
+            continue
+        # Without a rate for their currency, instances cannot be ranked against the rest.
+        rows = rows[priced[rows]]
+        groups.append((_root_bound(store, rows, need), key, rows))
+    groups.sort(key=lambda group: group[0])
+
+    found: List[Tuple[float, Tuple[str, str], np.ndarray, List[int], bool]] = []
+    for bound, key, rows in groups:
+        cutoff = found[-1][0] if len(found) >= limit else math.inf
+        if bound >= cutoff:
+            break
+        capacity = np.column_stack([np.nan_to_num(store.numeric[column][rows]) for column in CAPACITY_COLUMNS])
+        solution = solve_fleet(
+            store.numeric[COST_COLUMN][rows], capacity[:, required], need[required], max_nodes, cutoff
+        )
+        if solution is None:
+            continue
+        cost, counts, optimal = solution
+        found.append((cost, key, rows, counts, optimal))
+        found.sort(key=lambda entry: entry[0])
+        del found[limit:]
+    return [_describe(store, key, rows, counts, optimal) for _, key, rows, counts, optimal in found]
+
+
+def _describe(store, key: Tuple[str, str], rows: np.ndarray, counts: List[int], optimal: bool) -> Dict[str, Any]:
+    items = []
+    totals = {
+        "hourly_cost": 0.0, "monthly_cost": 0.0, "hourly_cost_normalized": 0.0, "monthly_cost_normalized": 0.0,
+        "vcpus": 0, "memory_gb": 0.0, "storage_gb": 0,
+    }
+    for row_index, count in zip(rows.tolist(), counts):
+        if not count:
+            continue
+        row = store.rows[row_index]
+        items.append({
+            "instance_name": row["instance_name"],
+            "count": count,
+            "hourly_cost": row["hourly_cost"],
+            "monthly_cost": row["monthly_cost"],
+            "vcpus": row["vcpus"],
+            "memory_gb": row["memory_gb"],
+            "storage_gb": row["storage_gb"],
+        })
+        for column in totals:
+            value = row[column]
+            if value is not None and not (isinstance(value, float) and math.isnan(value)):
+                totals[column] += count * value
+    items.sort(key=lambda item: (-item["count"], item["instance_name"]))
+    return {
+        "provider": key[0],
+        "region": key[1],
+        "currency": store.rows[rows[0]]["currency"],
+        "nodes": sum(item["count"] for item in items),
+        "optimal": optimal,
+        **{column: round(value, 6) if isinstance(value, float) else value for column, value in totals.items()},
+        "instances": items,
+    }
@@ -0,0 +1,58 @@
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NameIndex:
+    """
+    Trigram index over the distinct instance names of a snapshot, the in-memory
+    counterpart of the pg_trgm GIN index. A substring query intersects the posting
+    lists of its trigrams and only verifies the few surviving names, so lookups stay
+    cheap as the catalogue grows; queries shorter than three characters fall back to
+    a scan of the distinct names. Matching is case-insensitive, like ILIKE.
+    """
+
+    def __init__(self, names: List[str]):
+        self.names = names
+        self.lower = [name.lower() for name in names]
+
+        postings: Dict[str, List[int]] = {}
+        for code, name in enumerate(self.lower):
+            for gram in trigrams(name):
+                postings.setdefault(gram, []).append(code)
+        self.postings = {gram: np.array(codes, dtype=np.int32) for gram, codes in postings.items()}
+
+    def matching_codes(self, needle: str) -> np.ndarray:
+        """Codes of the names containing needle, in ascending order."""
+        needle = needle.lower()
+        grams = trigrams(needle)
+        if not grams:
+            return np.array([code for code, name in enumerate(self.lower) if needle in name], dtype=np.int32)
+
+        lists = sorted((self.postings.get(gram) for gram in grams), key=lambda codes: 0 if codes is None else len(codes))
+        if lists[0] is None:
+            return np.array([], dtype=np.int32)
+        candidates = lists[0]
+        for codes in lists[1:]:
+            candidates = np.intersect1d(candidates, codes, assume_unique=True)
+            if not len(candidates):
+                break
+        # Sharing every trigram does not guarantee a contiguous match; verify.
+        return np.array([code for code in candidates if needle in self.lower[code]], dtype=np.int32)
+
+    def rank(self, needle: str, codes: Optional[Iterable[int]] = None) -> List[int]:
+        """
+        Orders matching name codes for autocomplete: prefix matches first, then by
+        where the match starts, then shorter names, then alphabetically.
+        """
+        needle = needle.lower()
+        if codes is None:
+            codes = self.matching_codes(needle)
+        return sorted(
+            (int(code) for code in codes),
+            key=lambda code: (self.lower[code].find(needle), len(self.lower[code]), self.lower[code]),
+        )
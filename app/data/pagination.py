@@ -0,0 +1,91 @@
+import base64
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """
+    Keyset position (sort value, id) in a given sort order.
+
+    Rows are ordered by the tuple (sort value, id) with NULL sort values treated as
+    larger than any number, which matches PostgreSQL's default NULLS LAST for ASC and
+    NULLS FIRST for DESC. "next" cursors continue after the position, "prev" cursors
+    page back before it.
+    """
+    sort_by: str
+    sort_order: str
+    direction: str
+    value: Optional[Union[int, float]]
+    id: int
+
+
+def encode_cursor(sort_by: str, sort_order: str, direction: str, value: Optional[Union[int, float]], row_id: int) -> str:
+    payload = json.dumps([sort_by, sort_order, direction, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, sort_by: str, sort_order: str) -> Cursor:
+    """Decodes an opaque cursor, raising InvalidCursorError if it is malformed or was issued for another sort."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        cursor_sort_by, cursor_sort_order, direction, value, row_id = json.loads(
+            base64.urlsafe_b64decode(padded.encode("ascii"))
+        )
+    except (ValueError, TypeError, UnicodeError) as exc:
+        raise InvalidCursorError("Invalid cursor.") from exc
+
+    if direction not in ("next", "prev") or not isinstance(row_id, int):
+        raise InvalidCursorError("Invalid cursor.")
+    if value is not None and not isinstance(value, (int, float)):
+        raise InvalidCursorError("Invalid cursor.")
+    if cursor_sort_by != sort_by or cursor_sort_order != sort_order:
+        raise InvalidCursorError("Cursor was issued for a different sort order.")
+
+    return Cursor(sort_by, sort_order, direction, value, row_id)
+
+
+def scans_ascending(sort_order: str, cursor: Optional[Cursor]) -> bool:
+    """Whether the page is read in ascending (sort value, id) order; prev pages scan backwards."""
+    ascending = sort_order != "desc"
+    if cursor is not None and cursor.direction == "prev":
+        return not ascending
+    return ascending
+
+
+def build_page(
+    rows: Sequence[Any],
+    limit: int,
+    sort_by: str,
+    sort_order: str,
+    cursor: Optional[Cursor],
+    skip: int,
+    key: Callable[[Any], Tuple[Optional[Union[int, float]], int]],
+) -> Tuple[List[Any], Optional[str], Optional[str]]:
+    """
+    Trims a scan of up to limit + 1 rows to a page and derives its next/prev cursors.
+    `key` maps a row to its (sort value, id) pair.
+    """
+    has_more = len(rows) > limit
+    rows = list(rows[:limit])
+    backwards = cursor is not None and cursor.direction == "prev"
+    if backwards:
+        rows.reverse()
+
+    def token(direction, row):
+        value, row_id = key(row)
+        return encode_cursor(sort_by, sort_order, direction, value, row_id)
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if backwards or has_more:
+            next_cursor = token("next", rows[-1])
+        if has_more if backwards else (cursor is not None or skip > 0):
+            prev_cursor = token("prev", rows[0])
+
+    return rows, next_cursor, prev_cursor
@@ -0,0 +1,86 @@
+import sys
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from cachetools import LRUCache
+
+
+def estimate_result_size(result: Dict[str, Any]) -> int:
+    """Approximate bytes held by a get_instances result: the row dicts and their values."""
+    size = sys.getsizeof(result)
+    for row in result["instances"]:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+    return size
+
+
+class _EvictionCountingLRU(LRUCache):
+    def __init__(self, maxsize: int, getsizeof: Callable[[Any], int], on_evict: Callable[[], None]):
+        super().__init__(maxsize=maxsize, getsizeof=getsizeof)
+        self._on_evict = on_evict
+
+    def popitem(self):
+        item = super().popitem()
+        self._on_evict()
+        return item
+
+
+class ResultCache:
+    """
+    Size-bounded LRU of query results. There is no TTL: entries stay valid until
+    invalidate() is called after an ingest. A result computed across an invalidation
+    is not stored, since it may mix old and new data; callers take a generation
+    before running the query and hand it back to put().
+    """
+
+    def __init__(self, max_bytes: int, getsizeof: Callable[[Any], int] = estimate_result_size):
+        self.max_bytes = max_bytes
+        self._getsizeof = getsizeof
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = self._new_entries()
+
+    def _new_entries(self) -> LRUCache:
+        return _EvictionCountingLRU(max(self.max_bytes, 1), self._getsizeof, self._count_eviction)
+
+    def _count_eviction(self) -> None:
+        self.evictions += 1
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        if generation != self.generation:
+            return
+        try:
+            self._entries[key] = value
+        except ValueError:
+            # Larger than the whole cache.
+            pass
+
+    def invalidate(self) -> None:
+        # A fresh LRU rather than clear(), which would count every entry as an eviction.
+        self._entries = self._new_entries()
+        self.generation += 1
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": int(self._entries.currsize),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
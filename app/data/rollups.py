@@ -0,0 +1,163 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.data.column_store import ColumnStore
+
+# Columns the price-efficiency rollups are grouped by.
+ROLLUP_DIMENSIONS = ("region", "instance_family", "provider")
+# Hourly price divided by each of these columns.
+EFFICIENCY_METRICS = (("per_vcpu", "vcpus"), ("per_gb", "memory_gb"))
+
+
+def _group_starts(sorted_groups: np.ndarray) -> np.ndarray:
+    """Start offsets of each run of equal values, plus the total length as a final sentinel."""
+    if not len(sorted_groups):
+        return np.array([0], dtype=np.int64)
+    return np.concatenate(([0], np.flatnonzero(np.diff(sorted_groups)) + 1, [len(sorted_groups)]))
+
+
+def _quantile(sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    # Linear interpolation between closest ranks, as numpy.quantile's default, for every group at once.
+    position = starts + q * (counts - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def grouped_price_stats(groups: np.ndarray, values: np.ndarray) -> Dict[int, Dict[str, Any]]:
+    """
+    Min, median and p90 of values per group code, ignoring negative codes and NaN values.
+    One sort over the whole column, however many groups there are.
+    """
+    valid = (groups >= 0) & np.isfinite(values)
+    groups, values = groups[valid], values[valid]
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+
+    bounds = _group_starts(groups)
+    starts, counts = bounds[:-1], np.diff(bounds)
+    if not len(counts):
+        return {}
+    medians = _quantile(values, starts, counts, 0.5)
+    p90s = _quantile(values, starts, counts, 0.9)
+    return {
+        int(groups[start]): {
+            "instances": int(count),
+            "min": float(values[start]),
+            "median": float(median),
+            "p90": float(p90),
+        }
+        for start, count, median, p90 in zip(starts, counts, medians, p90s)
+    }
+
+
+def _combined_codes(store: "ColumnStore", columns: Tuple[str, ...]) -> np.ndarray:
+    """One int64 code per distinct combination of the columns' codes; -1 if any is NULL."""
+    combined = np.zeros(store.size, dtype=np.int64)
+    missing = np.zeros(store.size, dtype=bool)
+    for column in columns:
+        codes = store.codes[column]
+        combined = combined * (len(store.categories[column]) + 1) + codes
+        missing |= codes < 0
+    combined[missing] = -1
+    return combined
+
+
+def _decode(store: "ColumnStore", columns: Tuple[str, ...], combined: int) -> Dict[str, str]:
+    values = {}
+    for column in reversed(columns):
+        base = len(store.categories[column]) + 1
+        combined, code = divmod(combined, base)
+        values[column] = store.categories[column][code]
+    return values
+
+
+def _efficiency_rollup(store: "ColumnStore", dimension: str, hourly: np.ndarray) -> List[Dict[str, Any]]:
+    # Prices in different currencies are never mixed, so every group is (dimension, currency).
+    columns = (dimension, "currency")
+    groups = _combined_codes(store, columns)
+    priced = groups[(groups >= 0) & np.isfinite(hourly)]
+    codes, counts = np.unique(priced, return_counts=True)
+
+    stats = {}
+    for metric, column in EFFICIENCY_METRICS:
+        denominator = store.numeric[column]
+        stats[metric] = grouped_price_stats(groups, hourly / np.where(denominator > 0, denominator, np.nan))
+
+    rollup = []
+    for code, count in zip(codes.tolist(), counts.tolist()):
+        values = _decode(store, columns, code)
+        entry: Dict[str, Any] = {"key": values[dimension], "currency": values["currency"], "instances": count}
+        for metric, _ in EFFICIENCY_METRICS:
+            group = stats[metric].get(code)
+            entry[metric] = None if group is None else {name: group[name] for name in ("min", "median", "p90")}
+        rollup.append(entry)
+    rollup.sort(key=lambda entry: (entry["key"], entry["currency"]))
+    return rollup
+
+
+def _cheapest_per_region_family(store: "ColumnStore", hourly: np.ndarray) -> List[Dict[str, Any]]:
+    columns = ("region", "instance_family", "currency")
+    groups = _combined_codes(store, columns)
+    valid = np.flatnonzero((groups >= 0) & np.isfinite(hourly))
+    # Cheapest first within each group; ties go to the lowest id, as in /instances.
+    order = valid[np.lexsort((store.ids[valid], hourly[valid], groups[valid]))]
+    bounds = _group_starts(groups[order])
+
+    cheapest = []
+    for start in bounds[:-1]:
+        row = store.rows[order[start]]
+        cheapest.append({
+            "region": row["region"],
+            "instance_family": row["instance_family"],
+            "provider": row["provider"],
+            "instance_name": row["instance_name"],
+            "currency": row["currency"],
+            "hourly_cost": row["hourly_cost"],
+            "monthly_cost": row["monthly_cost"],
+            "vcpus": row["vcpus"],
+            "memory_gb": row["memory_gb"],
+        })
+    cheapest.sort(key=lambda entry: (entry["region"], entry["instance_family"], entry["currency"]))
+    return cheapest
+
+
+class PriceRollups:
+    """
+    Price-efficiency aggregates of one snapshot: min, median and p90 hourly price per
+    vCPU and per GB of memory for every region, family and provider, and the cheapest
+    instance of every (region, family). Built once per snapshot, i.e. once per ingest.
+    Instances without a positive price, vCPU count or memory size are left out of the
+    metric they would distort.
+    """
+
+    def __init__(self, store: "ColumnStore"):
+        self.version = store.version
+        hourly = store.numeric["hourly_cost"].copy()
+        hourly[~(hourly > 0)] = np.nan
+        self.efficiency: Dict[str, List[Dict[str, Any]]] = {
+            dimension: _efficiency_rollup(store, dimension, hourly) for dimension in ROLLUP_DIMENSIONS
+        }
+        self.cheapest = _cheapest_per_region_family(store, hourly)
+
+    def efficiency_for(self, dimension: str, currency: Optional[str] = None) -> List[Dict[str, Any]]:
+        rollup = self.efficiency[dimension]
+        return rollup if currency is None else [entry for entry in rollup if entry["currency"] == currency]
+
+    def cheapest_for(
+        self,
+        providers: Optional[List[str]] = None,
+        regions: Optional[List[str]] = None,
+        instance_families: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        wanted = (
+            ("provider", set(providers or ())),
+            ("region", set(regions or ())),
+            ("instance_family", set(instance_families or ())),
+        )
+        return [
+            entry for entry in self.cheapest
+            if all(not values or entry[column] in values for column, values in wanted)
+        ]
@@ -0,0 +1,154 @@
+import logging
+import math
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Same fields, in the same order, as schemas.VMInstance and the vm_instances columns,
+# less the normalized costs, which ingest derives from the fx_rates table.
+ROW_FIELDS = (
+    "instance_name",
+    "provider",
+    "region",
+    "vcpus",
+    "memory_gb",
+    "storage_gb",
+    "storage_type",
+    "hourly_cost",
+    "monthly_cost",
+    "spot_price",
+    "currency",
+    "instance_family",
+    "network_performance",
+    "last_updated",
+)
+_REQUIRED_TEXT = ("instance_name", "provider", "region", "storage_type", "currency")
+_OPTIONAL_TEXT = ("instance_family", "network_performance")
+_INTEGERS = ("vcpus", "storage_gb")
+_FLOATS = ("memory_gb", "hourly_cost", "monthly_cost", "spot_price")
+
+_NONE_TYPE = type(None)
+# Types a column may hold for a batch to pass validation without per-row fixes.
+_CLEAN_COLUMN_TYPES = {
+    **{name: {str} for name in _REQUIRED_TEXT},
+    **{name: {str, _NONE_TYPE} for name in _OPTIONAL_TEXT},
+    **{name: {int} for name in _INTEGERS},
+    **{name: {float, _NONE_TYPE} for name in _FLOATS},
+    "last_updated": {datetime},
+}
+_row_values = attrgetter(*ROW_FIELDS)
+
+
+class InstanceRow:
+    """
+    Compact ingest record for one instance offering. Providers build these instead of
+    Pydantic models; validation happens once per batch in validate_batch, and the
+    Pydantic schemas are only used at the API boundary.
+    """
+
+    __slots__ = ROW_FIELDS
+
+    def __init__(
+        self,
+        instance_name: str,
+        provider: str,
+        region: str,
+        vcpus: int,
+        memory_gb: Optional[float],
+        storage_gb: int,
+        storage_type: str,
+        hourly_cost: Optional[float] = None,
+        monthly_cost: Optional[float] = None,
+        spot_price: Optional[float] = None,
+        currency: str = "USD",
+        instance_family: Optional[str] = None,
+        network_performance: Optional[str] = None,
+        last_updated: Optional[datetime] = None,
+    ):
+        self.instance_name = instance_name
+        self.provider = provider
+        self.region = region
+        self.vcpus = vcpus
+        self.memory_gb = memory_gb
+        self.storage_gb = storage_gb
+        self.storage_type = storage_type
+        self.hourly_cost = hourly_cost
+        self.monthly_cost = monthly_cost
+        self.spot_price = spot_price
+        self.currency = currency
+        self.instance_family = instance_family
+        self.network_performance = network_performance
+        self.last_updated = last_updated
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(zip(ROW_FIELDS, _row_values(self)))
+
+    def __repr__(self) -> str:
+        return f"InstanceRow({self.provider!r}, {self.instance_name!r}, {self.region!r})"
+
+
+def _is_integer(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _has_valid_fields(row: InstanceRow) -> bool:
+    return (
+        all(isinstance(getattr(row, name), str) for name in _REQUIRED_TEXT)
+        and all(_is_integer(getattr(row, name)) for name in _INTEGERS)
+        and all(getattr(row, name) is None or isinstance(getattr(row, name), str) for name in _OPTIONAL_TEXT)
+    )
+
+
+def _coerce_floats(row: InstanceRow) -> bool:
+    for name in _FLOATS:
+        value = getattr(row, name)
+        if type(value) is float:
+            if math.isnan(value):
+                setattr(row, name, None)
+            continue
+        if value is None:
+            continue
+        if not _is_integer(value):
+            return False
+        setattr(row, name, float(value))
+    return True
+
+
+def _is_clean_batch(rows: List[InstanceRow]) -> bool:
+    """Column-wise type check of a whole batch; True when no row needs fixing."""
+    for name, values in zip(ROW_FIELDS, zip(*map(_row_values, rows))):
+        if not set(map(type, values)) <= _CLEAN_COLUMN_TYPES[name]:
+            return False
+        if name in _FLOATS and any(map(math.isnan, filter(None, values))):
+            return False
+    return True
+
+
+def validate_batch(rows: List[InstanceRow]) -> List[InstanceRow]:
+    """
+    Checks a batch of rows against the vm_instances types: required text must be
+    present, counts must be integers and prices/memory numeric or missing. The
+    common case is settled column by column for the whole batch; only a batch that
+    fails that check is walked row by row, widening integer prices to float,
+    turning NaN into None (as the API schema serializes it), stamping a missing
+    last_updated with the batch time and dropping invalid rows with one warning.
+    """
+    if not rows or _is_clean_batch(rows):
+        return rows
+
+    now = datetime.utcnow()
+    valid: List[InstanceRow] = []
+
+    for row in rows:
+        if not (_has_valid_fields(row) and _coerce_floats(row)):
+            continue
+        if row.last_updated is None:
+            row.last_updated = now
+        valid.append(row)
+
+    rejected = len(rows) - len(valid)
+    if rejected:
+        logger.warning("Dropped %d invalid rows from an ingest batch.", rejected)
+    return valid
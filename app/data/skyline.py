@@ -0,0 +1,40 @@
+from typing import Sequence
+
+import numpy as np
+
+
+def pareto_mask(cost: np.ndarray, capacities: Sequence[np.ndarray], keep_ties: bool = False) -> np.ndarray:
+    """
+    True for the points no other point dominates, i.e. the skyline. A point dominates
+    another when it costs no more and offers at least as much of every capacity,
+    and is strictly better in at least one. Of several identical points only the
+    first is kept, unless keep_ties. NaN capacities count as zero.
+
+    Sort-filter-skyline: once the points are ordered by price (then capacities,
+    largest first), a point can only be dominated by one before it, and only by one
+    already on the skyline, so each point is checked against the skyline so far
+    instead of against every other point.
+    """
+    # Every column oriented so that larger is better.
+    gains = np.column_stack([-np.asarray(cost, dtype=np.float64)] + [
+        np.nan_to_num(np.asarray(column, dtype=np.float64), nan=0.0) for column in capacities
+    ])
+    size = len(gains)
+    # Best first in every column; np.lexsort sorts by the last key first and is stable.
+    order = np.lexsort(tuple(-gains[:, column] for column in reversed(range(gains.shape[1]))))
+
+    skyline = np.empty_like(gains)
+    count = 0
+    keep = np.zeros(size, dtype=bool)
+    for index in order:
+        point = gains[index]
+        if count:
+            covers = (skyline[:count] >= point).all(axis=1)
+            if keep_ties:
+                covers &= (skyline[:count] > point).any(axis=1)
+            if covers.any():
+                continue
+        skyline[count] = point
+        count += 1
+        keep[index] = True
+    return keep
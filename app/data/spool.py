@@ -0,0 +1,38 @@
+import asyncio
+import pickle
+import tempfile
+from typing import AsyncIterator, List, Optional
+
+from app.data.rows import InstanceRow
+
+
+class BatchSpool:
+    """
+    Ingest batches buffered in an anonymous temporary file, so a refresh can be
+    fetched in full before its write starts without holding it in memory. Batches
+    are pickled one at a time and read back in order; the file disappears on close.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._file = tempfile.TemporaryFile(dir=directory or None)
+        self.batches = 0
+        self.rows = 0
+
+    async def append(self, batch: List[InstanceRow]) -> None:
+        await asyncio.to_thread(pickle.dump, batch, self._file, pickle.HIGHEST_PROTOCOL)
+        self.batches += 1
+        self.rows += len(batch)
+
+    async def read(self) -> AsyncIterator[List[InstanceRow]]:
+        await asyncio.to_thread(self._file.seek, 0)
+        for _ in range(self.batches):
+            yield await asyncio.to_thread(pickle.load, self._file)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "BatchSpool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
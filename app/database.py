@@ -1,11 +1,111 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import itertools
+import time
+from typing import Dict, List
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
+from app.core.metrics import InstrumentedQueuePool, instrument_engine, pool_stats, register_pool
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+def create_engine(url: str, name: str) -> AsyncEngine:
+    """An instrumented engine with the configured pool and statement cache, reported as `name`."""
+    connect_args = {}
+    if make_url(url).get_driver_name() == "asyncpg":
+        connect_args["prepared_statement_cache_size"] = settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+        if not settings.DB_PREPARED_STATEMENT_CACHE_SIZE:
+            # asyncpg's own statement cache as well, for PgBouncer.
+            connect_args["statement_cache_size"] = 0
+    new_engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    instrument_engine(new_engine)
+    register_pool(name, new_engine)
+    return new_engine
+
+engine = create_engine(settings.DATABASE_URL, "primary")
+# The worker coordinator's long-lived connection (leader lock and LISTEN), kept out of
+# the request pool: NullPool opens it on connect and really closes it on close.
+coordination_engine = create_async_engine(settings.DATABASE_URL, poolclass=NullPool)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)
+
+read_engines: List[AsyncEngine] = [
+    create_engine(url, f"replica{number}") for number, url in enumerate(settings.DATABASE_READ_REPLICA_URLS)
+]
+_replica_sessions = [
+    sessionmaker(autocommit=False, autoflush=False, bind=read_engine, class_=AsyncSession)
+    for read_engine in read_engines
+]
+_next_replica = itertools.cycle(_replica_sessions)
+_replicas_held_until = 0.0
+
 Base = declarative_base()
 
+def hold_reads_on_primary(seconds: float = settings.DB_REPLICA_HOLD_SECONDS):
+    """Sends reads to the primary for a while, e.g. until replicas have replayed an ingest."""
+    global _replicas_held_until
+    _replicas_held_until = max(_replicas_held_until, time.monotonic() + seconds)
+
+def ReadSessionLocal() -> AsyncSession:
+    """A session on the next replica, or on the primary when there is none or reads are held."""
+    if not _replica_sessions or time.monotonic() < _replicas_held_until:
+        return SessionLocal()
+    return next(_next_replica)()
+
 async def get_db():
     async with SessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_read_db():
+    """Session for read-only endpoints; see ReadSessionLocal."""
+    async with ReadSessionLocal() as session:
+        yield session
+
+def get_pool_stats() -> Dict[str, dict]:
+    engines = {"primary": engine}
+    engines.update((f"replica{number}", read_engine) for number, read_engine in enumerate(read_engines))
+    return {name: pool_stats(named.pool) for name, named in engines.items()}
+
+async def create_extensions(conn: AsyncConnection):
+    """Extensions the models depend on; pg_trgm backs the instance name trigram index."""
+    await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+# Key of the transaction-level advisory lock under which init_db changes the schema.
+SCHEMA_LOCK_KEY = 0x766D7073  # "vmps"
+
+async def init_db():
+    """
+    Creates any missing tables, columns and indexes; existing ones are left untouched.
+    Every worker runs this at startup, so it holds an advisory lock throughout and
+    inspects the tables only once it has the lock: the first worker migrates, the
+    others wait and then find nothing left to do.
+    """
+    from app import models  # noqa: F401  (registers the models on Base.metadata)
+    from app.data.dimensions import encode_string_columns
+
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        await create_extensions(conn)
+        await conn.run_sync(Base.metadata.create_all)
+        # create_all skips tables that already exist, so add columns and indexes introduced since.
+        for table in Base.metadata.sorted_tables:
+            existing = await conn.run_sync(
+                lambda sync_conn: {column["name"] for column in inspect(sync_conn).get_columns(table.name)}
+            )
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=conn.dialect)
+                    await conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        await encode_string_columns(conn)
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
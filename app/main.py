@@ -1,22 +1,44 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 from app.api.endpoints import router as api_router
+from app.api.http_cache import DatasetCacheMiddleware
 from app.core.config import settings
+from app.core.metrics import PrometheusMiddleware
+from app.data import data_manager
+from app.database import SessionLocal, init_db
+from app.providers.http_client import close_http_client
+from app.services.coordination import coordinator
 from app.services.scheduler import start_scheduler, stop_scheduler
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("Starting up...")
-    start_scheduler()
+    await init_db()
+    # Load the snapshot up front so the dataset version (and ETags) exist from the first request.
+    async with SessionLocal() as db:
+        await data_manager.get_column_store(db)
+    if settings.SCHEDULER_LEADER_ELECTION:
+        await coordinator.start()
+    else:
+        start_scheduler()
     
     yield 
     
     print("Shutting down...")
-    stop_scheduler()
+    if settings.SCHEDULER_LEADER_ELECTION:
+        await coordinator.stop()
+    else:
+        stop_scheduler()
+    await close_http_client()
 
 app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
 
+# Innermost first: responses are tagged, then compressed.
+app.add_middleware(DatasetCacheMiddleware, prefix="/api/v1")
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
@@ -24,5 +46,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so recorded latency covers the whole middleware stack.
+app.add_middleware(PrometheusMiddleware)
 
 app.include_router(api_router, prefix="/api/v1")
\ No newline at end of file
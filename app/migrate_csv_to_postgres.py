@@ -1,38 +1,61 @@
+import argparse
 import asyncio
+import time
 import pandas as pd
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.models import VMInstance
-from app.database import Base
+from app.database import Base, create_extensions
 from app.core.config import settings
+from app.data.data_manager import (
+    INGEST_LOCK_KEY,
+    NORMALIZED_COLUMNS,
+    announce_data_change,
+    load_fx_rates,
+    normalize_costs,
+)
+from app.data.dimensions import DIMENSIONS, DimensionKeys
+from app.data.bulk_load import (
+    LIVE_TABLE,
+    create_staging_table,
+    frame_to_records,
+    index_staging_table,
+    swap_staging_table,
+    write_records,
+)
 import numpy as np
 
 engine = create_async_engine(settings.DATABASE_URL)
 
-async def migrate():
-    print("Reading data from data/vm_pricing.csv...")
+async def migrate_orm(csv_path: str):
+    """Original row-by-row ORM load. Kept for comparison; prefer bulk_load()."""
+    print(f"Reading data from {csv_path}...")
     try:
-        df = pd.read_csv("data/vm_pricing.csv")
+        df = pd.read_csv(csv_path)
         df = df.replace({np.nan: None})
     except FileNotFoundError:
-        print("Error: data/vm_pricing.csv not found. Run a fetch script first.")
+        print(f"Error: {csv_path} not found. Run a fetch script first.")
         return
 
     df = df.where(pd.notnull(df), None)
 
     async with engine.begin() as conn:
         print("Dropping existing vm_instances table (if it exists)...")
-        await conn.run_sync(Base.metadata.drop_all, checkfirst=True)
+        await conn.run_sync(Base.metadata.drop_all, tables=[LIVE_TABLE], checkfirst=True)
         print("Creating new vm_instances table...")
+        await create_extensions(conn)
         await conn.run_sync(Base.metadata.create_all)
 
     AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-    
+
     async with AsyncSessionLocal() as session:
         print(f"Migrating {len(df)} rows to the database. This may take a moment...")
-        
+
+        keys = DimensionKeys()
+        rates = await load_fx_rates(session)
         for _, row in df.iterrows():
-            vm_instance = VMInstance(
+            record = dict(
                 instance_name=row.get('instance_name'),
                 provider=row.get('provider'),
                 region=row.get('region'),
@@ -48,10 +71,127 @@ async def migrate():
                 network_performance=row.get('network_performance'),
                 last_updated=pd.to_datetime(row.get('last_updated'))
             )
-            session.add(vm_instance)
-        
+            normalize_costs(record, rates)
+            session.add(VMInstance(**(await keys.encode(session, [record]))[0]))
+
         await session.commit()
         print("Migration successful!")
 
+async def encode_dimensions(conn, keys: DimensionKeys, chunk: pd.DataFrame) -> pd.DataFrame:
+    """Adds the <name>_id key columns for the chunk's provider, region, family and storage type names."""
+    for name in DIMENSIONS:
+        lookup = await keys.resolve(conn, name, chunk[name].dropna().unique().tolist())
+        chunk[f"{name}_id"] = chunk[name].map(lookup)
+    return chunk
+
+def normalize_frame_costs(chunk: pd.DataFrame, rates: dict) -> pd.DataFrame:
+    """Adds the reference-currency costs to a chunk, as ingest does; NaN without a rate for the currency."""
+    rate = chunk["currency"].map(rates)
+    for column in NORMALIZED_COLUMNS:
+        chunk[f"{column}_normalized"] = chunk[column] * rate
+    return chunk
+
+async def bulk_load(csv_path: str, chunk_size: int = 5000, use_copy: bool = True, staging: bool = False):
+    """
+    Streams the CSV in chunks and appends each one with COPY (or executemany).
+
+    Without staging the live table is recreated and loaded in place, a transaction
+    per chunk. With staging the snapshot is loaded into an unindexed
+    vm_instances_staging table, indexed and analyzed, then swapped in with a rename;
+    the live table keeps serving reads until the swap. The staging load is one
+    transaction under the ingest lock, since INGEST_MODE=swap refreshes build their
+    table in the same staging table, and the running workers are told to reload.
+    """
+    try:
+        chunks = pd.read_csv(csv_path, chunksize=chunk_size)
+    except FileNotFoundError:
+        print(f"Error: {csv_path} not found. Run a fetch script first.")
+        return
+
+    method = "COPY" if use_copy else "executemany"
+    keys = DimensionKeys()
+    total = 0
+    started = None
+
+    async def load_chunk(conn, chunk: pd.DataFrame) -> None:
+        nonlocal total
+        records = frame_to_records(await encode_dimensions(conn, keys, normalize_frame_costs(chunk, rates)))
+        total += await write_records(conn, target, records, use_copy=use_copy)
+        elapsed = time.perf_counter() - started
+        print(f"  {total} rows via {method} ({total / elapsed:,.0f} rows/sec)")
+
+    def report_load() -> None:
+        load_seconds = time.perf_counter() - started
+        print(f"Loaded {total} rows in {load_seconds:.2f}s ({total / max(load_seconds, 1e-9):,.0f} rows/sec).")
+
+    if staging:
+        async with engine.begin() as conn:
+            print("Waiting for any provider refresh in progress...")
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": INGEST_LOCK_KEY})
+            await create_extensions(conn)
+            await conn.run_sync(Base.metadata.create_all)
+            target = await create_staging_table(conn)
+            rates = await load_fx_rates(conn)
+            print(f"Loading into {target.name}; {LIVE_TABLE.name} stays live until the swap.")
+
+            started = time.perf_counter()
+            for chunk in chunks:
+                await load_chunk(conn, chunk)
+            report_load()
+
+            index_started = time.perf_counter()
+            await index_staging_table(conn)
+            print(f"Indexed and analyzed {target.name} in {time.perf_counter() - index_started:.2f}s.")
+
+            swap_started = time.perf_counter()
+            await swap_staging_table(conn)
+            await announce_data_change(conn, "csv")
+        print(f"Swapped {target.name} into {LIVE_TABLE.name} in {time.perf_counter() - swap_started:.3f}s.")
+    else:
+        async with engine.begin() as conn:
+            print("Dropping existing vm_instances table (if it exists)...")
+            await conn.run_sync(Base.metadata.drop_all, tables=[LIVE_TABLE], checkfirst=True)
+            print("Creating new vm_instances table...")
+            # The instance name trigram index needs pg_trgm.
+            await create_extensions(conn)
+            await conn.run_sync(Base.metadata.create_all)
+            target = LIVE_TABLE
+            # The stored rates, so the normalized costs are filled in from the start rather
+            # than only once the FX refresh job runs.
+            rates = await load_fx_rates(conn)
+
+        started = time.perf_counter()
+        for chunk in chunks:
+            async with engine.begin() as conn:
+                await load_chunk(conn, chunk)
+        report_load()
+
+    print("Migration successful!")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load a CSV snapshot into the vm_instances table.")
+    parser.add_argument("--csv", default=settings.DATA_FILE_PATH, help="Path to the CSV snapshot.")
+    parser.add_argument(
+        "--mode",
+        choices=["copy", "executemany", "orm"],
+        default="copy",
+        help="copy: PostgreSQL COPY per chunk; executemany: multi-row INSERT per chunk; orm: legacy row-by-row load.",
+    )
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Rows read and written per chunk.")
+    parser.add_argument(
+        "--staging",
+        action="store_true",
+        help="Load into a staging table and swap it in, instead of dropping the live table first.",
+    )
+    return parser.parse_args()
+
+async def main():
+    args = parse_args()
+    if args.mode == "orm":
+        await migrate_orm(args.csv)
+    else:
+        await bulk_load(args.csv, args.chunk_size, use_copy=args.mode == "copy", staging=args.staging)
+    await engine.dispose()
+
 if __name__ == "__main__":
-    asyncio.run(migrate())
\ No newline at end of file
+    asyncio.run(main())
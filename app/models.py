@@ -1,26 +1,89 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+from sqlalchemy import Column, Integer, SmallInteger, String, Float, DateTime, ForeignKey, Index
 from app.database import Base
 from datetime import datetime
 
+class _Dimension(Base):
+    """Dictionary of the distinct values of one vm_instances column, keyed by a small integer."""
+    __abstract__ = True
+
+    id = Column(SmallInteger, primary_key=True)
+    name = Column(String, nullable=False, unique=True)
+
+class Provider(_Dimension):
+    __tablename__ = "providers"
+
+class Region(_Dimension):
+    __tablename__ = "regions"
+
+class InstanceFamily(_Dimension):
+    __tablename__ = "instance_families"
+
+class StorageType(_Dimension):
+    __tablename__ = "storage_types"
+
+def _dimension_key(table: str, column: str, index: bool = False) -> Column:
+    return Column(SmallInteger, ForeignKey(f"{table}.id", name=f"vm_instances_{column}_fkey"), index=index)
+
 class VMInstance(Base):
+    """
+    One instance offering. The provider, region, family and storage type are stored
+    as keys of their dimension tables; app.data.dimensions joins the names back in.
+    """
     __tablename__ = "vm_instances"
 
     id = Column(Integer, primary_key=True, index=True)
     instance_name = Column(String, index=True)
-    provider = Column(String, index=True)
-    region = Column(String, index=True)
+    # Provider lookups use the leading column of idx_provider_region_vcpus_memory.
+    provider_id = _dimension_key("providers", "provider_id")
+    region_id = _dimension_key("regions", "region_id", index=True)
     vcpus = Column(Integer)
     memory_gb = Column(Float)
     storage_gb = Column(Integer)
-    storage_type = Column(String)
+    storage_type_id = _dimension_key("storage_types", "storage_type_id")
     hourly_cost = Column(Float, index=True)
     monthly_cost = Column(Float)
     spot_price = Column(Float, nullable=True)
     currency = Column(String, default="USD")
-    instance_family = Column(String, index=True)
+    # hourly_cost and monthly_cost converted to settings.REFERENCE_CURRENCY at the
+    # fx_rates rate; NULL while the currency has no rate. Cost filters and sorts use these.
+    hourly_cost_normalized = Column(Float, index=True)
+    monthly_cost_normalized = Column(Float, index=True)
+    instance_family_id = _dimension_key("instance_families", "instance_family_id", index=True)
     network_performance = Column(String, nullable=True)
     last_updated = Column(DateTime, default=datetime.utcnow)
 
     __table_args__ = (
-        Index('idx_provider_region_vcpus_memory', 'provider', 'region', 'vcpus', 'memory_gb'),
-    )
\ No newline at end of file
+        Index('idx_provider_region_vcpus_memory', 'provider_id', 'region_id', 'vcpus', 'memory_gb'),
+        # Trigram index so substring (ILIKE '%...%') name searches need not scan the table.
+        Index(
+            'idx_vm_instances_name_trgm',
+            'instance_name',
+            postgresql_using='gin',
+            postgresql_ops={'instance_name': 'gin_trgm_ops'},
+        ),
+    )
+
+class FxRate(Base):
+    """Value of one unit of `currency` in the reference currency, as last loaded."""
+    __tablename__ = "fx_rates"
+
+    currency = Column(String, primary_key=True)
+    rate = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class PriceHistory(Base):
+    """Append-only log of price observations, written when an instance appears or its price changes."""
+    __tablename__ = "price_history"
+
+    id = Column(Integer, primary_key=True)
+    provider = Column(String, nullable=False)
+    instance_name = Column(String, nullable=False)
+    region = Column(String, nullable=False)
+    hourly_cost = Column(Float)
+    monthly_cost = Column(Float)
+    currency = Column(String)
+    recorded_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('idx_price_history_instance', 'provider', 'instance_name', 'region', 'recorded_at'),
+    )
@@ -0,0 +1,199 @@
+import csv
+import json
+import logging
+import re
+import time
+from typing import Dict, Iterator, TextIO
+
+logger = logging.getLogger(__name__)
+
+# Column names of the CSV offer file for the attributes used by the Pricing API filters.
+CSV_FILTER_COLUMNS = {
+    "operatingSystem": "Operating System",
+    "tenancy": "Tenancy",
+    "preInstalledSw": "Pre Installed S/W",
+    "capacitystatus": "CapacityStatus",
+}
+CSV_ATTRIBUTE_COLUMNS = {
+    "instanceType": "Instance Type",
+    "location": "Location",
+    "vcpu": "vCPU",
+    "memory": "Memory",
+    "storage": "Storage",
+    "instanceFamily": "Instance Family",
+    "networkPerformance": "Network Performance",
+}
+
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+
+class _IncrementalJSONReader:
+    """
+    Pull parser over a JSON document read in fixed-size chunks. Objects can be walked
+    member by member and individual values decoded with json's C scanner, so only the
+    value being decoded and one chunk are ever held in memory.
+    """
+
+    def __init__(self, fp: TextIO, chunk_size: int):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of offer file.")
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of the offer file buffer.")
+        self.pos += 1
+
+    def value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A value ending exactly at the buffer edge may be a truncated number.
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def members(self) -> Iterator[str]:
+        """Yields the keys of the object at the cursor; the caller consumes each value."""
+        self._expect("{")
+        if self._peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(":")
+            yield key
+            separator = self._peek()
+            self.pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Malformed object in offer file near offset {self.pos}.")
+
+
+def _iter_json_offer_file(fp: TextIO, filters: Dict[str, str], chunk_size: int) -> Iterator[dict]:
+    """
+    Streams an EC2 JSON offer file. The attributes of every matching product are kept
+    in memory until "terms" is reached, since prices come after all the products;
+    the OnDemand terms are then joined to them one SKU at a time, and every other
+    section is decoded value by value and dropped. Assumes the published layout, where
+    "products" precedes "terms" and "OnDemand" comes first inside "terms".
+    """
+    reader = _IncrementalJSONReader(fp, chunk_size)
+    products: Dict[str, dict] = {}
+
+    for key in reader.members():
+        if key == "products":
+            for sku in reader.members():
+                product = reader.value()
+                attributes = product.get("attributes", {})
+                if all(attributes.get(name) == value for name, value in filters.items()):
+                    products[sku] = {"attributes": attributes}
+        elif key == "terms":
+            for term_type in reader.members():
+                if term_type != "OnDemand":
+                    reader.value()
+                    continue
+                for sku in reader.members():
+                    terms = reader.value()
+                    product = products.pop(sku, None)
+                    if product is not None:
+                        yield {"product": product, "terms": {"OnDemand": terms}}
+                # Reserved and other term types follow and are not needed.
+                return
+        else:
+            reader.value()
+
+
+def _iter_csv_offer_file(fp: TextIO, filters: Dict[str, str]) -> Iterator[dict]:
+    """
+    Streams an EC2 CSV offer file, one price row at a time. Rows are turned into the
+    Pricing API's product shape so they go through the same parser.
+    """
+    rows = csv.reader(fp)
+    for header in rows:
+        # The header follows a few "key","value" metadata lines.
+        if header and header[0] == "SKU":
+            break
+    else:
+        return
+
+    column = {name: index for index, name in enumerate(header)}
+    filter_columns = [(column[CSV_FILTER_COLUMNS[name]], value) for name, value in filters.items()]
+    attribute_columns = [(name, column[csv_name]) for name, csv_name in CSV_ATTRIBUTE_COLUMNS.items()]
+    sku_column, term_column = column["SKU"], column["TermType"]
+    rate_column, price_column, currency_column = column["RateCode"], column["PricePerUnit"], column["Currency"]
+
+    for row in rows:
+        if len(row) < len(header) or row[term_column] != "OnDemand":
+            continue
+        if any(row[index] != value for index, value in filter_columns):
+            continue
+
+        yield {
+            "product": {"attributes": {name: row[index] for name, index in attribute_columns}},
+            "terms": {
+                "OnDemand": {
+                    row[sku_column]: {
+                        "priceDimensions": {
+                            row[rate_column]: {"pricePerUnit": {row[currency_column]: row[price_column]}}
+                        }
+                    }
+                }
+            },
+        }
+
+
+def iter_offer_file_products(path: str, filters: Dict[str, str], chunk_size: int = 1 << 20) -> Iterator[dict]:
+    """
+    Streams products from a locally mirrored EC2 offer file (JSON or CSV, chosen by
+    extension) in the same shape as Pricing API get_products entries, keeping only
+    those whose attributes match `filters`. Only the matching products' attributes
+    are held in memory (for JSON, until their prices are read); the rest of the file
+    is streamed, so memory grows with the filtered catalogue, not with the file.
+    """
+    started = time.perf_counter()
+    count = 0
+
+    with open(path, "r", encoding="utf-8", newline="") as fp:
+        if path.lower().endswith(".csv"):
+            products = _iter_csv_offer_file(fp, filters)
+        else:
+            products = _iter_json_offer_file(fp, filters, chunk_size)
+
+        for product in products:
+            count += 1
+            yield product
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "Parsed %d products from %s in %.1fs (%.0f products/sec).",
+        count, path, elapsed, count / elapsed if elapsed else 0.0,
+    )
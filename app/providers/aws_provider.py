@@ -1,8 +1,11 @@
 import boto3
 import json
-from typing import List
+from typing import Any, AsyncIterator, Iterator, List, Optional
 from datetime import datetime
-from app.api.schemas import VMInstance
+from app.data.rows import InstanceRow
+from app.core.config import settings
+from .aws_offer_file import iter_offer_file_products
+from . import normalization
 from .base_provider import BaseProvider
 import asyncio
 import os
@@ -10,70 +13,140 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+PRODUCT_FILTERS = [
+    {"Type": "TERM_MATCH", "Field": "operatingSystem", "Value": "Linux"},
+    {"Type": "TERM_MATCH", "Field": "tenancy", "Value": "Shared"},
+    {"Type": "TERM_MATCH", "Field": "preInstalledSw", "Value": "NA"},
+    {"Type": "TERM_MATCH", "Field": "capacitystatus", "Value": "Used"},
+]
+
 class AWSProvider(BaseProvider):
-    def __init__(self):
+    # The Pricing API pages slowly through tens of thousands of products.
+    refresh_timeout_seconds = 3600
+
+    def __init__(self, pricing_client: Any = None, offer_file_path: Optional[str] = None):
         super().__init__("AWS")
-        
-        self.pricing_client = boto3.client(
+
+        # When set, products are read from a locally mirrored EC2 offer file instead of the Pricing API.
+        self.offer_file_path = offer_file_path if offer_file_path is not None else settings.AWS_OFFER_FILE_PATH
+
+        # A client can be injected, e.g. one wrapped in botocore's Stubber for offline runs.
+        self.pricing_client = pricing_client or boto3.client(
             "pricing", 
             region_name="us-east-1",
             aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
             aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
         )
 
-    async def fetch_data(self) -> List[VMInstance]:
+    def _iter_products(self) -> Iterator[dict]:
+        """Pages through get_products, decoding each PriceList entry as its page arrives."""
+        if self.offer_file_path:
+            filters = {item["Field"]: item["Value"] for item in PRODUCT_FILTERS}
+            yield from iter_offer_file_products(self.offer_file_path, filters)
+            return
+
+        paginator = self.pricing_client.get_paginator("get_products")
+        pages = paginator.paginate(ServiceCode="AmazonEC2", Filters=PRODUCT_FILTERS)
+
+        for page in pages:
+            for product_json in page["PriceList"]:
+                yield json.loads(product_json)
+
+    def _price_per_hour(self, product: dict) -> Optional[str]:
+        on_demand_terms = product.get("terms", {}).get("OnDemand")
+        if not on_demand_terms:
+            return None
+
+        sku = list(on_demand_terms.keys())[0]
+        price_dimensions = list(on_demand_terms[sku]["priceDimensions"].values())
+        if not price_dimensions:
+            return None
+
+        price_per_hour_str = price_dimensions[0].get("pricePerUnit", {}).get("USD")
+        if not price_per_hour_str or float(price_per_hour_str) == 0.0:
+            return None
+        return price_per_hour_str
+
+    def _parse_batch(self, products: List[dict]) -> List[InstanceRow]:
+        """
+        Parses a batch of products. The memory and storage strings repeat across
+        regions, so each distinct one is normalized once for the whole batch.
+        """
+        offers = []
+        for product in products:
+            price_per_hour_str = self._price_per_hour(product)
+            if price_per_hour_str is not None:
+                offers.append((product["product"]["attributes"], price_per_hour_str))
+
+        memory = normalization.aws_memory_gb.normalize_many(str(attrs.get("memory")) for attrs, _ in offers)
+        storage = normalization.aws_storage_gb.normalize_many(
+            attrs.get("storage", "0 GB") for attrs, _ in offers if isinstance(attrs.get("storage", "0 GB"), str)
+        )
+
+        now = datetime.utcnow()
+        instances: List[InstanceRow] = []
+        for attrs, price_per_hour_str in offers:
+            memory_gb = memory[str(attrs.get("memory"))]
+            storage_gb = storage.get(attrs.get("storage", "0 GB"))
+            if memory_gb is None or storage_gb is None:
+                continue
+
+            try:
+                instances.append(InstanceRow(
+                    instance_name=attrs.get("instanceType"),
+                    provider=self.provider_name,
+                    region=attrs.get("location"),
+                    vcpus=int(attrs.get("vcpu")),
+                    memory_gb=memory_gb,
+                    storage_gb=storage_gb,
+                    storage_type=attrs.get("storage", "EBS Only"),
+                    hourly_cost=float(price_per_hour_str),
+                    monthly_cost=float(price_per_hour_str) * 730,
+                    instance_family=attrs.get("instanceFamily"),
+                    network_performance=attrs.get("networkPerformance"),
+                    last_updated=now
+                ))
+            except (ValueError, TypeError):
+                continue
+
+        return instances
+
+    def _iter_batches(self, batch_size: int) -> Iterator[List[InstanceRow]]:
+        products: List[dict] = []
+        for product in self._iter_products():
+            products.append(product)
+            if len(products) < batch_size:
+                continue
+            with self.timed("parse"):
+                batch = self._parse_batch(products)
+            products = []
+            if batch:
+                yield batch
+        if products:
+            with self.timed("parse"):
+                batch = self._parse_batch(products)
+            if batch:
+                yield batch
+
+    async def fetch_batches(self, batch_size: int) -> AsyncIterator[List[InstanceRow]]:
+        """
+        Streams On-Demand Linux instances from the AWS Pricing API or the offer file.
+        boto3 is blocking, so each batch is fetched and parsed in a worker thread
+        and the event loop stays free while pages download.
+        """
+        batches = self._iter_batches(batch_size)
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            yield batch
+
+    async def fetch_data(self) -> List[InstanceRow]:
         """
         Fetches EC2 pricing data using the AWS Pricing API.
         This is a simplified example focusing on On-Demand Linux instances.
         """
         instances = []
-        paginator = self.pricing_client.get_paginator("get_products")
-        pages = paginator.paginate(
-            ServiceCode="AmazonEC2",
-            Filters=[
-                {"Type": "TERM_MATCH", "Field": "operatingSystem", "Value": "Linux"},
-                {"Type": "TERM_MATCH", "Field": "tenancy", "Value": "Shared"},
-                {"Type": "TERM_MATCH", "Field": "preInstalledSw", "Value": "NA"},
-                {"Type": "TERM_MATCH", "Field": "capacitystatus", "Value": "Used"},
-            ],
-        )
-
-        for page in pages:
-            for product_json in page["PriceList"]:
-                product = json.loads(product_json)
-                
-                on_demand_terms = product.get("terms", {}).get("OnDemand")
-                if not on_demand_terms:
-                    continue
-
-                sku = list(on_demand_terms.keys())[0]
-                price_dimensions = list(on_demand_terms[sku]["priceDimensions"].values())
-                if not price_dimensions:
-                    continue
-                
-                price_per_hour_str = price_dimensions[0].get("pricePerUnit", {}).get("USD")
-                if not price_per_hour_str or float(price_per_hour_str) == 0.0:
-                    continue
-
-                attrs = product["product"]["attributes"]
-                
-                try:
-                    instance = VMInstance(
-                        instance_name=attrs.get("instanceType"),
-                        provider=self.provider_name,
-                        region=attrs.get("location"),
-                        vcpus=int(attrs.get("vcpu")),
-                        memory_gb=float(str(attrs.get("memory")).replace(" GiB", "")),
-                        storage_gb=int(str(attrs.get("storage", "0 GB")).split(" ")[0].replace(",", "")) if "EBS" not in attrs.get("storage", "") else 0,
-                        storage_type=attrs.get("storage", "EBS Only"),
-                        hourly_cost=float(price_per_hour_str),
-                        monthly_cost=float(price_per_hour_str) * 730,
-                        instance_family=attrs.get("instanceFamily"),
-                        network_performance=attrs.get("networkPerformance"),
-                        last_updated=datetime.utcnow()
-                    )
-                    instances.append(instance)
-                except (ValueError, TypeError) as e:
-                    continue
-        
-        return instances
\ No newline at end of file
+        async for batch in self.fetch_batches(1000):
+            instances.extend(batch)
+        return instances
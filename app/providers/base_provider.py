@@ -1,18 +1,58 @@
+import time
 from abc import ABC, abstractmethod
-from typing import List
-from app.api.schemas import VMInstance
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+from app.data.rows import InstanceRow
+
+
+class ProviderDataUnchanged(Exception):
+    """Raised by fetch_data when the upstream source reports nothing changed since the last refresh."""
+
 
 class BaseProvider(ABC):
+    # Seconds a refresh attempt may spend fetching; None uses REFRESH_TIMEOUT_SECONDS.
+    refresh_timeout_seconds: Optional[float] = None
+
     def __init__(self, provider_name: str):
         self.provider_name = provider_name
+        self.stage_seconds: Dict[str, float] = {}
 
     @abstractmethod
-    async def fetch_data(self) -> List[VMInstance]:
+    async def fetch_data(self) -> List[InstanceRow]:
         """
         Fetches pricing data from the cloud provider and transforms it
-        into the common VMInstance schema.
+        into InstanceRow records.
         """
         pass
 
+    async def fetch_batches(self, batch_size: int) -> AsyncIterator[List[InstanceRow]]:
+        """
+        Yields the provider's instances in batches of at most batch_size.
+        The default fetches everything first; providers with paginated sources
+        override this to stream batches as pages arrive.
+        """
+        instances = await self.fetch_data()
+        for start in range(0, len(instances), batch_size):
+            yield instances[start:start + batch_size]
+
+    def on_refresh_committed(self) -> None:
+        """
+        Called once a refresh's data has been written. Providers that revalidate
+        upstream responses keep their new validators only from this point on.
+        """
+        pass
+
+    def reset_stage_timings(self) -> None:
+        self.stage_seconds = {}
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        """Adds the time spent in the block to stage_seconds[stage], e.g. "parse"."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + time.perf_counter() - started
+
     def get_name(self) -> str:
-        return self.provider_name
\ No newline at end of file
+        return self.provider_name
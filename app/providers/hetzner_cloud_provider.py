@@ -1,69 +1,92 @@
 import asyncio
-import json
 import logging
-import re
 from datetime import datetime
 from typing import Any, List
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
 
-from app.api.schemas import VMInstance
+from app.data.rows import InstanceRow
 from app.core.config import settings
-from .base_provider import BaseProvider
+from . import normalization
+from .base_provider import BaseProvider, ProviderDataUnchanged
+from .http_client import ConditionalFetcher
 
 logger = logging.getLogger(__name__)
 
 
 class HetznerCloudProvider(BaseProvider):
-    def __init__(self):
-        super().__init__("Hetzner Cloud")
-        self.base_url = "https://api.hetzner.cloud/v1"
-
-    def _request_json(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
-        query = f"?{urlencode(params)}" if params else ""
-        request = Request(f"{self.base_url}{path}{query}")
-        request.add_header("Authorization", f"Bearer {settings.HETZNER_CLOUD_API_TOKEN}")
-        request.add_header("Content-Type", "application/json")
+    refresh_timeout_seconds = 300
 
-        with urlopen(request, timeout=30) as response:
-            return json.loads(response.read().decode("utf-8"))
+    def __init__(self, base_url: str = "https://api.hetzner.cloud/v1"):
+        super().__init__("Hetzner Cloud")
+        self.base_url = base_url
+        self._fetcher = ConditionalFetcher()
+
+    async def _request_json(self, path: str, params: dict[str, Any] | None = None) -> tuple[dict[str, Any], bool]:
+        return await self._fetcher.get_json(
+            f"{self.base_url}{path}",
+            params=params,
+            headers={"Authorization": f"Bearer {settings.HETZNER_CLOUD_API_TOKEN}"},
+        )
+
+    async def _get_server_types(self) -> tuple[list[dict[str, Any]], bool]:
+        first, changed = await self._request_json("/server_types", {"page": 1, "per_page": 50})
+        pages = [first]
+
+        pagination = first.get("meta", {}).get("pagination", {})
+        last_page = pagination.get("last_page")
+        if last_page:
+            # Page count is known up front, so the remaining pages go out together.
+            rest = await asyncio.gather(*(
+                self._request_json("/server_types", {"page": page, "per_page": 50})
+                for page in range(2, int(last_page) + 1)
+            ))
+            for payload, page_changed in rest:
+                pages.append(payload)
+                changed = changed or page_changed
+        else:
+            next_page = pagination.get("next_page")
+            while next_page:
+                payload, page_changed = await self._request_json(
+                    "/server_types", {"page": int(next_page), "per_page": 50}
+                )
+                pages.append(payload)
+                changed = changed or page_changed
+                next_page = payload.get("meta", {}).get("pagination", {}).get("next_page")
 
-    async def _get_server_types(self) -> list[dict[str, Any]]:
         server_types: list[dict[str, Any]] = []
-        page = 1
-
-        while True:
-            payload = await asyncio.to_thread(
-                self._request_json,
-                "/server_types",
-                {"page": page, "per_page": 50},
-            )
-
+        for payload in pages:
             server_types.extend(payload.get("server_types", []))
-            pagination = payload.get("meta", {}).get("pagination", {})
-            next_page = pagination.get("next_page")
-            if not next_page:
-                break
-            page = int(next_page)
+        return server_types, changed
 
-        return server_types
+    async def _get_currency(self) -> tuple[str, bool]:
+        payload, changed = await self._request_json("/pricing")
+        return str(payload.get("pricing", {}).get("currency", "EUR")), changed
 
-    async def _get_currency(self) -> str:
-        payload = await asyncio.to_thread(self._request_json, "/pricing")
-        return str(payload.get("pricing", {}).get("currency", "EUR"))
+    def on_refresh_committed(self) -> None:
+        self._fetcher.commit()
 
     def _instance_family(self, instance_name: str) -> str:
-        match = re.match(r"[A-Za-z]+", instance_name)
-        return match.group(0) if match else "General"
+        return normalization.family_prefix(instance_name) or "General"
 
-    async def fetch_data(self) -> List[VMInstance]:
+    async def fetch_data(self) -> List[InstanceRow]:
         if not settings.HETZNER_CLOUD_API_TOKEN:
             logger.warning("Hetzner Cloud API token not configured. Skipping Hetzner Cloud refresh.")
             return []
 
-        data = await self._get_server_types()
-        currency = await self._get_currency()
-        instances: list[VMInstance] = []
+        self._fetcher.discard()
+        (data, types_changed), (currency, currency_changed) = await asyncio.gather(
+            self._get_server_types(), self._get_currency()
+        )
+        if not (types_changed or currency_changed):
+            raise ProviderDataUnchanged(f"{self.provider_name} server types and pricing not modified.")
+
+        with self.timed("parse"):
+            instances = self._build_instances(data, currency)
+
+        return instances
+
+    def _build_instances(self, data: list[dict[str, Any]], currency: str) -> list[InstanceRow]:
+        now = datetime.utcnow()
+        instances: list[InstanceRow] = []
 
         for item in data:
             prices = item.get("prices", [])
@@ -75,7 +98,7 @@ class HetznerCloudProvider(BaseProvider):
                 monthly_net = float(price_monthly.get("net", 0) or 0)
 
                 instances.append(
-                    VMInstance(
+                    InstanceRow(
                         instance_name=str(item.get("name", "unknown")),
                         provider=self.provider_name,
                         region=str(price.get("location", "unknown")),
@@ -88,7 +111,7 @@ class HetznerCloudProvider(BaseProvider):
                         currency=currency,
                         instance_family=self._instance_family(str(item.get("name", ""))),
                         network_performance=f"{item.get('cpu_type', 'shared')} / {item.get('architecture', 'unknown')}",
-                        last_updated=datetime.utcnow(),
+                        last_updated=now,
                     )
                 )
 
@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Process-wide keep-alive client shared by the HTTP providers. httpx negotiates
+    gzip/deflate (and brotli when available) and reuses pooled connections.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@dataclass
+class _CachedResponse:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    payload: Any
+
+
+class ConditionalFetcher:
+    """
+    Conditional JSON GETs for one provider. Responses carrying an ETag or
+    Last-Modified are remembered and revalidated with If-None-Match /
+    If-Modified-Since; a 304 returns the remembered payload marked unchanged.
+
+    Validators seen during a refresh are staged and only become current on
+    commit(), which callers invoke once the refreshed data has been written, so a
+    failed write is never masked by a later 304.
+    """
+
+    def __init__(self):
+        self._committed: Dict[str, _CachedResponse] = {}
+        self._staged: Dict[str, _CachedResponse] = {}
+
+    async def get_json(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        auth: Optional[httpx.Auth] = None,
+    ) -> Tuple[Any, bool]:
+        """Returns (payload, changed)."""
+        key = str(httpx.URL(url, params=params))
+        cached = self._committed.get(key)
+
+        request_headers = dict(headers or {})
+        if cached is not None:
+            if cached.etag:
+                request_headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                request_headers["If-Modified-Since"] = cached.last_modified
+
+        response = await get_http_client().get(url, params=params, headers=request_headers, auth=auth)
+        if response.status_code == 304 and cached is not None:
+            self._staged[key] = cached
+            return cached.payload, False
+
+        response.raise_for_status()
+        payload = response.json()
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._staged[key] = _CachedResponse(etag, last_modified, payload)
+        return payload, True
+
+    def discard(self) -> None:
+        self._staged = {}
+
+    def commit(self) -> None:
+        self._committed = self._staged
+        self._staged = {}
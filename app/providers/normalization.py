@@ -0,0 +1,179 @@
+import hashlib
+import re
+from typing import Callable, Dict, Generic, Iterable, NamedTuple, Optional, TypeVar
+
+from cachetools import LRUCache
+
+T = TypeVar("T")
+
+# Joins multi-line descriptions into a single cache key; never appears in provider text.
+LINE_SEPARATOR = "\x1f"
+
+
+def content_key(value: str) -> bytes:
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+
+
+class AttributeNormalizer(Generic[T]):
+    """
+    Memoizes a pure parser of free-text provider attributes. Results live in a bounded
+    LRU keyed by a digest of the input, so an entry costs the same however long the
+    text, and since the normalizers below are module-level they carry over from one
+    refresh to the next. Catalogues repeat a handful of distinct strings, so almost
+    every lookup after the first refresh is a hit.
+    """
+
+    def __init__(self, parse: Callable[[str], T], maxsize: int = 4096):
+        self.parse = parse
+        self._cache: LRUCache = LRUCache(maxsize=maxsize)
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, value: str) -> T:
+        key = content_key(value)
+        try:
+            result = self._cache[key]
+        except KeyError:
+            self.misses += 1
+            result = self._cache[key] = self.parse(value)
+        else:
+            self.hits += 1
+        return result
+
+    def normalize_many(self, values: Iterable[str]) -> Dict[str, T]:
+        """Normalizes a batch, parsing (or looking up) each distinct value once."""
+        return {value: self(value) for value in set(values)}
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# --- AWS -------------------------------------------------------------------------
+
+def parse_aws_memory_gb(value: str) -> Optional[float]:
+    """"16 GiB" -> 16.0; None when the value is not a plain GiB figure."""
+    try:
+        return float(value.replace(" GiB", ""))
+    except ValueError:
+        return None
+
+
+def parse_aws_storage_gb(value: str) -> Optional[int]:
+    """"2 x 900 NVMe SSD" -> 2, "EBS only" -> 0; None when unparseable."""
+    if "EBS" in value:
+        return 0
+    try:
+        return int(value.split(" ")[0].replace(",", ""))
+    except ValueError:
+        return None
+
+
+# --- Hetzner ---------------------------------------------------------------------
+
+_LEADING_LETTERS = re.compile(r"[A-Za-z]+")
+
+_VCPU_PATTERNS = [
+    re.compile(r"(\d+)\s*[- ]?core"),
+    re.compile(r"(\d+)\s*x\s*core"),
+    re.compile(r"(\d+)\s*x\s*cpu"),
+]
+_NAMED_CORE_COUNTS = [
+    ("single-core", 1),
+    ("dual-core", 2),
+    ("quad-core", 4),
+    ("hexa-core", 6),
+    ("octa-core", 8),
+]
+_MEMORY_LINE = re.compile(r"(\d+(?:\.\d+)?)\s*GB.*RAM", re.IGNORECASE)
+_STORAGE_LINE = re.compile(r"\b(SSD|HDD|NVMe|SATA)\b", re.IGNORECASE)
+_STORAGE_SIZE = re.compile(r"(\d+)\s*x\s*(\d+(?:\.\d+)?)\s*(TB|GB)", re.IGNORECASE)
+_NETWORK_LINE = re.compile(r"(gbit|mbit)", re.IGNORECASE)
+
+
+class HardwareSpec(NamedTuple):
+    vcpus: int
+    memory_gb: Optional[float]
+    storage_gb: int
+    storage_type: str
+    network_performance: Optional[str]
+
+
+def parse_family_prefix(name: str) -> Optional[str]:
+    """Leading letters of an instance name, e.g. "cx" for "cx22"."""
+    match = _LEADING_LETTERS.match(name)
+    return match.group(0) if match else None
+
+
+def _parse_vcpus(text: str) -> int:
+    lower = text.lower()
+    for pattern in _VCPU_PATTERNS:
+        match = pattern.search(lower)
+        if match:
+            return int(match.group(1))
+
+    for phrase, count in _NAMED_CORE_COUNTS:
+        if phrase in lower:
+            return count
+    return 0
+
+
+def _parse_storage(storage_line: str) -> tuple:
+    if not storage_line:
+        return 0, "Unknown"
+
+    match = _STORAGE_SIZE.search(storage_line)
+    if match:
+        total = int(match.group(1)) * float(match.group(2))
+        if match.group(3).upper() == "TB":
+            total *= 1024
+        storage_gb = int(total)
+    else:
+        storage_gb = 0
+
+    lower = storage_line.lower()
+    for marker, storage_type in (("nvme", "NVMe"), ("ssd", "SSD"), ("hdd", "HDD"), ("sata", "SATA")):
+        if marker in lower:
+            return storage_gb, storage_type
+    return storage_gb, "Unknown"
+
+
+def parse_hetzner_description(value: str) -> HardwareSpec:
+    """
+    Parses a Robot product description, given as its lines joined with
+    LINE_SEPARATOR, into cores, RAM, disks and network.
+    """
+    lines = value.split(LINE_SEPARATOR) if value else []
+
+    memory_gb = None
+    for line in lines:
+        match = _MEMORY_LINE.search(line)
+        if match:
+            memory_gb = float(match.group(1))
+            break
+
+    storage_line = next((line for line in lines if _STORAGE_LINE.search(line)), "")
+    storage_gb, storage_type = _parse_storage(storage_line)
+    network_performance = next((line.strip() for line in lines if _NETWORK_LINE.search(line)), None)
+
+    return HardwareSpec(
+        vcpus=_parse_vcpus(" ".join(lines)),
+        memory_gb=memory_gb,
+        storage_gb=storage_gb,
+        storage_type=storage_type,
+        network_performance=network_performance,
+    )
+
+
+aws_memory_gb = AttributeNormalizer(parse_aws_memory_gb)
+aws_storage_gb = AttributeNormalizer(parse_aws_storage_gb)
+hetzner_hardware = AttributeNormalizer(parse_hetzner_description)
+family_prefix = AttributeNormalizer(parse_family_prefix)
+
+NORMALIZERS = {
+    "aws_memory_gb": aws_memory_gb,
+    "aws_storage_gb": aws_storage_gb,
+    "hetzner_hardware": hetzner_hardware,
+    "family_prefix": family_prefix,
+}
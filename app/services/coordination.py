@@ -0,0 +1,141 @@
+import asyncio
+import json
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.data import data_manager
+from app.database import SessionLocal, coordination_engine
+from app.services.scheduler import pause_scheduler, start_scheduler, stop_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Session-level advisory lock held by the one process that runs the refresh scheduler.
+LEADER_LOCK_KEY = 0x766D706C  # "vmpl"
+
+
+class WorkerCoordinator:
+    """
+    Coordinates the worker processes of one deployment (e.g. Gunicorn with Uvicorn
+    workers) through PostgreSQL.
+
+    Each worker keeps one dedicated connection, outside the request pool. On it the workers race for a
+    session-level advisory lock; the holder is the leader and alone runs the refresh
+    scheduler. The others retry every LEADER_POLL_SECONDS, so when the leader exits
+    (or its connection drops, which releases the lock) another worker takes over.
+
+    The same connection LISTENs for the NOTIFY an ingest sends on commit; every
+    worker but the one that ingested then reloads its snapshot and drops its cached
+    counts and results. Notifications arriving during a reload are coalesced.
+    """
+
+    def __init__(self, poll_seconds: float = settings.LEADER_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.is_leader = False
+        self._conn: Optional[AsyncConnection] = None
+        self._tasks: list = []
+        self._reload_requested = asyncio.Event()
+        self._missed_notifications = False
+
+    async def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._run()),
+            asyncio.create_task(self._reload_on_notify()),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.is_leader:
+            stop_scheduler()
+        await self._close()
+        self.is_leader = False
+
+    async def _connect(self) -> None:
+        conn = await coordination_engine.connect()
+        # Autocommit, so the long-lived connection never sits idle in a transaction.
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        raw_connection = await conn.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        if hasattr(driver_connection, "add_listener"):
+            await driver_connection.add_listener(data_manager.INGEST_NOTIFY_CHANNEL, self._on_notify)
+        else:
+            logger.warning("Driver cannot LISTEN; other workers' ingests will not refresh this worker's caches.")
+        self._conn = conn
+        if self._missed_notifications:
+            # Notifications sent while disconnected were lost; reload to be safe.
+            self._reload_requested.set()
+        self._missed_notifications = False
+
+    async def _close(self) -> None:
+        """
+        Releases the leader lock and closes the connection. It is not pooled, so
+        closing it ends the session, which drops the LISTEN and any lock the unlock
+        could not release.
+        """
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        if self.is_leader:
+            try:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LEADER_LOCK_KEY})
+            except Exception:
+                logger.debug("Error releasing the leader lock.", exc_info=True)
+        try:
+            await conn.close()
+        except Exception:
+            logger.debug("Error closing coordination connection.", exc_info=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if self._conn is None:
+                    await self._connect()
+                if self.is_leader:
+                    # Leadership lasts as long as the connection; make sure it is still there.
+                    await self._conn.execute(text("SELECT 1"))
+                else:
+                    acquired = await self._conn.scalar(
+                        text("SELECT pg_try_advisory_lock(:key)"), {"key": LEADER_LOCK_KEY}
+                    )
+                    if acquired:
+                        self.is_leader = True
+                        logger.info("This worker is now the refresh leader.")
+                        start_scheduler()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Coordination connection failed; reconnecting.")
+                if self.is_leader:
+                    pause_scheduler()
+                await self._close()
+                self.is_leader = False
+                self._missed_notifications = True
+            await asyncio.sleep(self.poll_seconds)
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            origin = json.loads(payload).get("origin")
+        except ValueError:
+            origin = None
+        if origin != data_manager.PROCESS_ID:
+            self._reload_requested.set()
+
+    async def _reload_on_notify(self) -> None:
+        while True:
+            await self._reload_requested.wait()
+            self._reload_requested.clear()
+            try:
+                async with SessionLocal() as db:
+                    await data_manager.load_column_store(db)
+                data_manager.invalidate_read_caches()
+            except Exception:
+                logger.exception("Reloading the snapshot after another worker's ingest failed.")
+
+
+coordinator = WorkerCoordinator()
@@ -0,0 +1,44 @@
+import logging
+import xml.etree.ElementTree as ElementTree
+from typing import Dict
+
+from app.core.config import settings
+from app.data import data_manager
+from app.database import SessionLocal
+from app.providers.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+
+def parse_reference_rates(document: bytes, reference_currency: str) -> Dict[str, float]:
+    """
+    Rates from an ECB-style XML document (Cube elements quoting units of `currency`
+    per euro) as the value of one unit of each currency in reference_currency.
+    """
+    per_euro = {"EUR": 1.0}
+    for element in ElementTree.fromstring(document).iter():
+        if "currency" in element.attrib and "rate" in element.attrib:
+            per_euro[element.attrib["currency"]] = float(element.attrib["rate"])
+    if reference_currency not in per_euro:
+        raise ValueError(f"No rate for the reference currency {reference_currency}.")
+    return {currency: per_euro[reference_currency] / rate for currency, rate in per_euro.items() if rate > 0}
+
+
+async def refresh_fx_rates() -> None:
+    """
+    Scheduled job: loads the latest rates into fx_rates and re-derives the normalized
+    costs. If the download fails the stored rates are applied again, so rows written
+    before any rate was known are still normalized once one is.
+    """
+    rates: Dict[str, float] = {}
+    if settings.FX_RATES_URL:
+        try:
+            response = await get_http_client().get(settings.FX_RATES_URL)
+            response.raise_for_status()
+            rates = parse_reference_rates(response.content, settings.REFERENCE_CURRENCY)
+        except Exception:
+            logger.exception("Fetching FX rates failed; keeping the stored rates.")
+
+    async with SessionLocal() as db:
+        changed = await data_manager.update_fx_rates(db, rates)
+    logger.info("FX rates refreshed: %d rates loaded, %d instances renormalized.", len(rates), changed)
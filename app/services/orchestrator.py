@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.data.rows import InstanceRow
+from app.core.config import settings
+from app.core.metrics import refresh_rows, refresh_runs, refresh_stage_duration
+from app.data.data_manager import spool_batches, write_provider_spool
+from app.database import SessionLocal
+from app.providers.base_provider import BaseProvider, ProviderDataUnchanged
+
+logger = logging.getLogger(__name__)
+
+_END_OF_STREAM = None
+
+
+@dataclass
+class ProviderRunStatus:
+    """Outcome of the most recent refresh of one provider."""
+    provider: str
+    state: str = "idle"
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    attempts: int = 0
+    rows: int = 0
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+    last_error: Optional[str] = None
+    last_success_at: Optional[datetime] = None
+
+
+class RefreshOrchestrator:
+    """
+    Runs provider refreshes with bounded concurrency, per-provider timeouts and
+    retries with exponential backoff. A provider's timeout is its entry in
+    timeout_overrides, else its own refresh_timeout_seconds, else timeout_seconds.
+
+    Each attempt is split into two tasks joined by a bounded queue: a fetch stage that pulls
+    parsed batches from the provider (under the fetch concurrency limit and the
+    timeout) and a write stage that spools them to disk and, once the fetch is done,
+    writes them to the database. Writes are serialized in-process and only then take
+    the ingest lock, and a provider's fetch slot is released as soon as its fetch
+    finishes, so neither a slow write nor a slow upstream holds up another provider.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = settings.REFRESH_MAX_CONCURRENCY,
+        timeout_seconds: float = settings.REFRESH_TIMEOUT_SECONDS,
+        timeout_overrides: Optional[Dict[str, float]] = None,
+        max_retries: int = settings.REFRESH_MAX_RETRIES,
+        backoff_seconds: float = settings.REFRESH_RETRY_BACKOFF_SECONDS,
+        batch_size: int = settings.INGEST_BATCH_SIZE,
+        queue_max_batches: int = settings.REFRESH_QUEUE_MAX_BATCHES,
+    ):
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        if timeout_overrides is None:
+            timeout_overrides = settings.REFRESH_TIMEOUT_SECONDS_BY_PROVIDER
+        self.timeout_overrides = dict(timeout_overrides)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.batch_size = batch_size
+        self.queue_max_batches = queue_max_batches
+        self.status: Dict[str, ProviderRunStatus] = {}
+        self._fetch_slots = asyncio.Semaphore(max_concurrency)
+        self._write_slot = asyncio.Lock()
+
+    def timeout_for(self, provider: BaseProvider) -> float:
+        override = self.timeout_overrides.get(provider.get_name())
+        if override is not None:
+            return override
+        if provider.refresh_timeout_seconds is not None:
+            return provider.refresh_timeout_seconds
+        return self.timeout_seconds
+
+    def get_status(self) -> List[ProviderRunStatus]:
+        return [self.status[name] for name in sorted(self.status)]
+
+    async def run(self, providers: List[BaseProvider]) -> List[ProviderRunStatus]:
+        return list(await asyncio.gather(*(self.refresh(provider) for provider in providers)))
+
+    async def refresh(self, provider: BaseProvider) -> ProviderRunStatus:
+        name = provider.get_name()
+        status = self.status.setdefault(name, ProviderRunStatus(provider=name))
+        status.state = "queued"
+        status.started_at = datetime.utcnow()
+        status.finished_at = None
+        status.attempts = 0
+        status.rows = 0
+        status.stage_seconds = {}
+
+        for attempt in range(1, self.max_retries + 2):
+            status.attempts = attempt
+            try:
+                status.rows = await self._attempt(provider, status)
+                provider.on_refresh_committed()
+                status.state = "succeeded" if status.rows else "empty"
+                status.last_error = None
+                status.last_success_at = datetime.utcnow()
+                logger.info("Refreshed %s: %d rows, stages %s.", name, status.rows, _format_stages(status.stage_seconds))
+                break
+            except ProviderDataUnchanged:
+                # Upstream answered 304 everywhere; the stored rows are already current.
+                status.state = "unchanged"
+                status.last_error = None
+                status.last_success_at = datetime.utcnow()
+                logger.info("Skipped %s: upstream data not modified.", name)
+                break
+            except Exception as exc:
+                status.last_error = f"{type(exc).__name__}: {exc}" if str(exc) else type(exc).__name__
+                if attempt > self.max_retries:
+                    status.state = "failed"
+                    logger.exception("Refresh of %s failed after %d attempts.", name, attempt)
+                    break
+                delay = self.backoff_seconds * 2 ** (attempt - 1)
+                status.state = "retrying"
+                logger.warning("Refresh of %s failed (%s); retrying in %.0fs.", name, status.last_error, delay)
+                await asyncio.sleep(delay)
+
+        status.finished_at = datetime.utcnow()
+        _record_metrics(status)
+        return status
+
+    async def _attempt(self, provider: BaseProvider, status: ProviderRunStatus) -> int:
+        # Bounded, so a fetch outrunning its spool waits instead of buffering the catalogue.
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_max_batches)
+        fetch_task = asyncio.create_task(self._fetch(provider, queue, status))
+        write_task = asyncio.create_task(self._write(provider, queue, status))
+        tasks = (fetch_task, write_task)
+
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            return await write_task
+        finally:
+            # If either stage failed the other is abandoned; cancelling the writer rolls
+            # its transaction back, so the stored rows stay as they were.
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _fetch(self, provider: BaseProvider, queue: asyncio.Queue, status: ProviderRunStatus) -> None:
+        """
+        Feeds the provider's batches into the queue. The timeout budget only runs while
+        waiting on the provider: time blocked on a full queue is the spool's, and is
+        reported as the "backpressure" stage instead of as fetch time.
+        """
+        async with self._fetch_slots:
+            status.state = "fetching"
+            provider.reset_stage_timings()
+            budget = self.timeout_for(provider)
+            fetching = blocked = 0.0
+            batches = provider.fetch_batches(self.batch_size)
+            try:
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        async with asyncio.timeout(budget - fetching):
+                            batch = await anext(batches)
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        fetching += time.perf_counter() - started
+
+                    started = time.perf_counter()
+                    await queue.put(batch)
+                    blocked += time.perf_counter() - started
+            finally:
+                await batches.aclose()
+                parse_seconds = provider.stage_seconds.get("parse", 0.0)
+                status.stage_seconds["parse"] = round(parse_seconds, 3)
+                status.stage_seconds["fetch"] = round(max(fetching - parse_seconds, 0.0), 3)
+                status.stage_seconds["backpressure"] = round(blocked, 3)
+        status.state = "writing"
+        await queue.put(_END_OF_STREAM)
+
+    async def _write(self, provider: BaseProvider, queue: asyncio.Queue, status: ProviderRunStatus) -> int:
+        async def batches() -> AsyncIterator[List[InstanceRow]]:
+            while True:
+                batch = await queue.get()
+                if batch is _END_OF_STREAM:
+                    return
+                yield batch
+
+        # The database is only touched once the fetch has finished, so a refresh that
+        # ends up unchanged or empty never opens a transaction.
+        with await spool_batches(batches()) as spool:
+            if not spool.rows:
+                return 0
+            async with self._write_slot:
+                started = time.perf_counter()
+                async with SessionLocal() as db:
+                    rows = await write_provider_spool(db, provider.get_name(), spool)
+                status.stage_seconds["write"] = round(time.perf_counter() - started, 3)
+        return rows
+
+
+def _record_metrics(status: ProviderRunStatus) -> None:
+    refresh_runs.inc(status.provider, status.state)
+    if status.state in ("succeeded", "empty"):
+        refresh_rows.set(status.rows, status.provider)
+    for stage, seconds in status.stage_seconds.items():
+        refresh_stage_duration.observe(seconds, status.provider, stage)
+
+
+def _format_stages(stage_seconds: Dict[str, float]) -> str:
+    return ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in stage_seconds.items())
+
+
+orchestrator = RefreshOrchestrator()
@@ -3,8 +3,8 @@ from app.providers.aws_provider import AWSProvider
 from app.providers.hetzner_cloud_provider import HetznerCloudProvider
 from app.providers.hetzner_bare_metal_provider import HetznerBareMetalProvider
 # from app.providers.gcp_provider import GCPProvider
-from app.data.data_manager import update_provider_data
-from app.database import SessionLocal
+from app.services.fx_rates import refresh_fx_rates
+from app.services.orchestrator import orchestrator
 from app.core.config import settings
 import logging
 from datetime import datetime
@@ -15,24 +15,15 @@ logging.getLogger('apscheduler').setLevel(logging.INFO)
 scheduler = AsyncIOScheduler()
 
 async def refresh_provider_data(provider_instance):
-    """Generic job to refresh data for a given provider."""
-    provider_name = provider_instance.get_name()
-    print(f"Starting data refresh for {provider_name}...")
-    
-    async with SessionLocal() as db_session:
-        try:
-            data = await provider_instance.fetch_data()
-            if data:
-                count = await update_provider_data(db_session, provider_name, data)
-                print(f"Successfully refreshed and saved {count} instances for {provider_name}.")
-            else:
-                print(f"No data fetched for {provider_name}.")
-        except Exception as e:
-            print(f"Error refreshing data for {provider_name}: {e}")
+    """
+    Generic job to refresh data for a given provider. Concurrency, timeouts,
+    retries and status reporting are handled by the refresh orchestrator.
+    """
+    await orchestrator.refresh(provider_instance)
 
 def start_scheduler():
     """
-    Adds jobs to the scheduler and starts it.
+    Adds jobs to the scheduler and starts it, or resumes it after pause_scheduler().
     """
     aws_provider = AWSProvider()
     scheduler.add_job(
@@ -41,7 +32,8 @@ def start_scheduler():
         hours=settings.REFRESH_INTERVAL_AWS,
         args=[aws_provider],
         id='aws_refresh_job',
-        next_run_time=datetime.now()
+        next_run_time=datetime.now(),
+        replace_existing=True
     )
 
     hetzner_cloud_provider = HetznerCloudProvider()
@@ -51,7 +43,8 @@ def start_scheduler():
         hours=settings.REFRESH_INTERVAL_HETZNER_CLOUD,
         args=[hetzner_cloud_provider],
         id='hetzner_cloud_refresh_job',
-        next_run_time=datetime.now()
+        next_run_time=datetime.now(),
+        replace_existing=True
     )
 
     hetzner_bare_metal_provider = HetznerBareMetalProvider()
@@ -61,16 +54,35 @@ def start_scheduler():
         hours=settings.REFRESH_INTERVAL_HETZNER_BARE_METAL,
         args=[hetzner_bare_metal_provider],
         id='hetzner_bare_metal_refresh_job',
-        next_run_time=datetime.now()
+        next_run_time=datetime.now(),
+        replace_existing=True
     )
     
+    scheduler.add_job(
+        refresh_fx_rates,
+        'interval',
+        hours=settings.REFRESH_INTERVAL_FX_RATES,
+        id='fx_rates_refresh_job',
+        next_run_time=datetime.now(),
+        replace_existing=True
+    )
+
     # gcp_provider = GCPProvider()
     # scheduler.add_job(refresh_provider_data, 'interval', hours=settings.REFRESH_INTERVAL_GCP, args=[gcp_provider])
 
     if not scheduler.running:
         scheduler.start()
+    else:
+        scheduler.resume()
     print("Scheduler started.")
 
+def pause_scheduler():
+    """Drops the refresh jobs and pauses the scheduler, e.g. when this process stops being leader."""
+    if scheduler.running:
+        scheduler.remove_all_jobs()
+        scheduler.pause()
+    print("Scheduler paused.")
+
 def stop_scheduler():
     if scheduler.running:
         scheduler.shutdown()
@@ -1,6 +1,7 @@
 import asyncio
-import pandas as pd
 from dotenv import load_dotenv
+from app.api.export import write_csv
+from app.data.rows import ROW_FIELDS
 from app.providers.aws_provider import AWSProvider
 from app.providers.hetzner_cloud_provider import HetznerCloudProvider
 
@@ -36,10 +37,9 @@ async def main():
 
     print(f"Total fetched rows: {len(all_instances)}")
 
-    df = pd.DataFrame([row.model_dump() for row in all_instances])
-
     output_file = "data/vm_pricing.csv"
-    df.to_csv(output_file, index=False)
+    with open(output_file, "w", newline="") as file:
+        write_csv(file, (row.as_dict() for row in all_instances), fields=ROW_FIELDS)
     print(f"Data successfully saved to {output_file}")
 
 if __name__ == "__main__":